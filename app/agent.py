@@ -1,60 +1,307 @@
+import asyncio
+import datetime
 import logging
-from typing import List, Dict, Any
-
-# ADK imports - adjust based on final package structure
-from google.cloud.aiplatform.preview.agents import Agent, ToolConfig, ChatAgent # Using ChatAgent for potential future extensions
+import re
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 
 from . import config
-from .tools import hr_tools
-from .schemas import RecruitingWorkflowInput, RecruitingWorkflowOutput, CandidateSchema
+from .caching import SingleFlight, hash_secret
+from .prompt_budget import estimate_prompt_tokens
+from .metrics import llm_turn_duration, workflow_duration, workflows_in_flight
+from .instrumentation import timed_step
+from .tracing import start_span
+from .tools import get_hr_tools, search_cache_key, tool_declarations
+from .pipeline import run_deterministic_workflow
+from .run_context import EventListener, WorkflowRun, active_run
+from .sessions import ChatSessionManager
+from .schemas import RecruitingWorkflowInput, RecruitingWorkflowOutput, CandidateSchema, WorkflowTimings
 
 logger = logging.getLogger(__name__)
 
 # --- Agent Definition ---
 
-# Configure the tools for the agent
-tool_config = ToolConfig(tool_list=hr_tools)
-
 # Define the core instructions for the LLM. This is crucial for guiding the workflow.
-# It needs to understand the sequence: Login -> Search -> Save (Loop)
-AGENT_INSTRUCTIONS = """
+# It needs to understand the sequence: Login -> Search -> Save (Batch)
+AGENT_INSTRUCTIONS_TEMPLATE = """
 You are an HR Recruiting Assistant. Your goal is to automate the process of finding and saving candidate profiles based on user-provided criteria.
 
 Follow these steps precisely:
 1.  **Authenticate:** Use the 'login_user' tool with the provided username and password.
 2.  **Check Login:** If login fails, stop immediately and report the authentication error. Do not proceed.
-3.  **Search Candidates:** If login is successful, use the 'search_for_candidates' tool with the provided job title and skills.
+3.  **Search Candidates:** If login is successful, use the 'search_for_candidates' tool with the provided job title and skills. If additional searches are requested, run each of them as well. If the result includes a 'next_cursor', more candidates are available: after saving the current page, call the tool again with that cursor to fetch the next page.
 4.  **Check Search Results:** If the search fails or returns no candidates, report this outcome.
-5.  **Save Candidates:** If candidates are found, iterate through EACH candidate returned by the search results. For EACH candidate, use the 'save_candidate_record' tool with their name, title, and skills list. Keep track of which candidates were saved successfully and which failed.
-6.  **Report Outcome:** Summarize the entire process. Report the total number of candidates found, the number successfully saved, and list any specific errors encountered during login, search, or saving individual candidates.
+5.  **Save Candidates:** If candidates are found, save ALL of them (from every search) with a single call to the 'save_candidate_records' tool, passing the full list of candidate objects returned by the search. Use the per-candidate results it returns to see which candidates were saved successfully and which failed. Candidates reported as 'skipped' were already saved by an earlier run and are not failures. Only use 'save_candidate_record' (including the candidate's id) to retry an individual candidate.
+{report_step}
 """
 
-# Create the Agent instance
-# Using ChatAgent allows potential multi-turn interactions if needed later,
-# but for this workflow, we'll use a single invoke call.
-hr_agent = ChatAgent(
-    model=config.AGENT_MODEL_NAME,
-    tool_config=tool_config,
-    instructions=AGENT_INSTRUCTIONS,
-    # Add project/location if required by your ADK setup/authentication
-    # project=config.GCP_PROJECT_ID,
-    # location=config.GCP_LOCATION,
+# Final step when counts are parsed from the LLM's summary text (LLM_RESULT_SOURCE=text)
+_REPORT_STEP_WITH_COUNTS = """6.  **Report Outcome:** Summarize the entire process. Report the total number of candidates found, the number successfully saved, and list any specific errors encountered during login, search, or saving individual candidates."""
+
+# Final step when counts and errors are collected from the tool results (LLM_RESULT_SOURCE=tools)
+_REPORT_STEP_NARRATIVE = """6.  **Report Outcome:** Reply with a short narrative summary (two or three sentences) of how the workflow went. Exact counts and per-candidate errors are collected automatically from the tool results, so do not list them."""
+
+# Same workflow in as few tokens as possible (PROMPT_MODE=compact). The instructions and tool
+# declarations are sent with every LLM turn; compare the two modes with benchmarks/prompt_benchmark.py
+_COMPACT_INSTRUCTIONS = """
+HR recruiting assistant. Steps:
+1. login_user with the given username and password. On failure, stop and report the error.
+2. search_for_candidates with the given title and skills, and each additional search requested. If next_cursor is set, save this page, then call again with that cursor.
+3. If a search fails or finds no candidates, report it.
+4. save_candidate_records once with ALL candidates found. Use its per-candidate results; 'skipped' means already saved, not failed. Use save_candidate_record (with id) only to retry one candidate.
+{report_step}
+"""
+
+_COMPACT_REPORT_STEP_WITH_COUNTS = """5. Report total candidates found, number saved, and any login, search or save errors."""
+
+_COMPACT_REPORT_STEP_NARRATIVE = """5. Reply with a 2-3 sentence summary. Counts and errors are collected from tool results; do not list them."""
+
+def build_agent_instructions(prompt_mode: str) -> str:
+    """ The agent's system prompt for PROMPT_MODE `prompt_mode` ("full" or "compact"). """
+    with_counts = config.LLM_RESULT_SOURCE == "text"
+    if prompt_mode == "compact":
+        template = _COMPACT_INSTRUCTIONS
+        report_step = _COMPACT_REPORT_STEP_WITH_COUNTS if with_counts else _COMPACT_REPORT_STEP_NARRATIVE
+    else:
+        template = AGENT_INSTRUCTIONS_TEMPLATE
+        report_step = _REPORT_STEP_WITH_COUNTS if with_counts else _REPORT_STEP_NARRATIVE
+    return template.format(report_step=report_step)
+
+AGENT_INSTRUCTIONS = build_agent_instructions(config.PROMPT_MODE)
+
+# The Agent instance is created on first LLM-mode use (or by preload_agent at startup),
+# so importing this module does not pull in the Vertex AI SDK.
+_hr_agent = None
+_hr_agent_expires_at: Optional[float] = None # Set when the agent uses a context cache, which expires
+_hr_agent_lock = threading.Lock() # The agent may be built from a preload thread and a request at once
+
+def _agent_if_current():
+    """ The built agent, or None if it has not been built or its context cache has (nearly) expired. """
+    if _hr_agent_expires_at is not None and time.monotonic() >= _hr_agent_expires_at:
+        return None
+    return _hr_agent
+
+def get_hr_agent():
+    """ Returns the shared ChatAgent, importing the ADK and building it on first call. """
+    global _hr_agent, _hr_agent_expires_at
+    agent = _agent_if_current()
+    if agent is not None:
+        return agent
+    with _hr_agent_lock:
+        agent = _agent_if_current()
+        if agent is not None:
+            return agent
+        # ADK imports - adjust based on final package structure
+        from google.cloud.aiplatform.preview.agents import ToolConfig, ChatAgent # Using ChatAgent for potential future extensions
+
+        started = time.monotonic()
+        # Configure the tools for the agent
+        tool_config = ToolConfig(tool_list=get_hr_tools())
+        logger.info(f"Agent prompt mode {config.PROMPT_MODE}: ~{estimate_prompt_tokens(AGENT_INSTRUCTIONS, tool_declarations(config.PROMPT_MODE))} tokens per turn")
+        # Static instructions go into a model-side context cache when possible, so repeat
+        # turns are not billed for them as fresh input tokens
+        prompt_kwargs = _context_cache_kwargs()
+        # Using ChatAgent allows potential multi-turn interactions if needed later,
+        # but for this workflow, we'll use a single invoke call.
+        _hr_agent = ChatAgent(
+            model=config.AGENT_MODEL_NAME,
+            tool_config=tool_config,
+            **prompt_kwargs,
+            # Add project/location if required by your ADK setup/authentication
+            # project=config.GCP_PROJECT_ID,
+            # location=config.GCP_LOCATION,
+        )
+        _hr_agent_expires_at = (
+            # Rebuild a minute before the cache expires rather than hit an expired cache mid-turn;
+            # chat sessions started by the old agent then move to a new chat (see ChatSessionManager)
+            started + config.CONTEXT_CACHE_TTL_SECONDS - 60 if "cached_content" in prompt_kwargs else None
+        )
+        logger.info(f"Built HR agent ({config.AGENT_MODEL_NAME}) in {time.monotonic() - started:.2f}s")
+    return _hr_agent
+
+# First google-cloud-aiplatform release whose ChatAgent takes cached_content and whose
+# CachedContent.create takes tools
+CONTEXT_CACHE_MIN_SDK_VERSION = (1, 51, 0)
+
+def _sdk_version() -> Optional[Tuple[int, ...]]:
+    try:
+        from google.cloud import aiplatform
+    except ImportError:
+        return None
+    return tuple(int(part) for part in re.findall(r"\d+", aiplatform.__version__)[:3])
+
+def _context_cache_kwargs() -> Dict[str, Any]:
+    """
+    ChatAgent kwargs carrying the system prompt: a Vertex AI context cache holding
+    AGENT_INSTRUCTIONS and the tool declarations when enabled and supported, else the
+    plain instructions. Older SDKs and any failure creating the cache (e.g. a prompt
+    below the model's minimum cacheable size) fall back to plain instructions.
+    """
+    plain = {"instructions": AGENT_INSTRUCTIONS}
+    if not config.CONTEXT_CACHE_ENABLED:
+        return plain
+    version = _sdk_version()
+    if version is None or version < CONTEXT_CACHE_MIN_SDK_VERSION:
+        logger.info(
+            f"Context caching needs google-cloud-aiplatform >= {'.'.join(map(str, CONTEXT_CACHE_MIN_SDK_VERSION))}, "
+            f"found {'.'.join(map(str, version)) if version else 'none'}; sending instructions with every turn"
+        )
+        return plain
+    try:
+        from vertexai.generative_models import FunctionDeclaration, Tool
+        from vertexai.preview import caching
+
+        # The declarations are sent with every turn too, so they belong in the cache
+        tools = [Tool(function_declarations=[
+            FunctionDeclaration(name=d["name"], description=d["description"], parameters=d["parameters"])
+            for d in tool_declarations(config.PROMPT_MODE)
+        ])]
+        cached_content = caching.CachedContent.create(
+            model_name=config.AGENT_MODEL_NAME,
+            system_instruction=AGENT_INSTRUCTIONS,
+            tools=tools,
+            ttl=datetime.timedelta(seconds=config.CONTEXT_CACHE_TTL_SECONDS),
+        )
+    except Exception as e:
+        logger.warning(f"Context caching unavailable, sending instructions with every turn: {e}")
+        return plain
+    logger.info(f"Cached agent instructions and tools as {getattr(cached_content, 'name', cached_content)}")
+    return {"cached_content": cached_content}
+
+async def preload_agent() -> Dict[str, Any]:
+    """ Builds the agent in a worker thread so the SDK import does not block the event loop. """
+    await asyncio.to_thread(get_hr_agent)
+    return {"model": config.AGENT_MODEL_NAME}
+
+# Deliberately tiny, so the warm-up ping costs next to nothing in tokens
+MODEL_PING_MESSAGE = "Health check: reply with the single word 'ready'. Do not call any tools."
+
+async def ping_model() -> Dict[str, Any]:
+    """ Builds the agent and sends it one cheap message, so the first real request skips the model's cold start. """
+    await preload_agent()
+    started = time.monotonic()
+    await get_hr_agent().start_chat().send_message_async(MODEL_PING_MESSAGE)
+    return {"model": config.AGENT_MODEL_NAME, "ping_seconds": round(time.monotonic() - started, 3)}
+
+# Chat sessions reused across requests with the same session_id (LLM mode only)
+chat_sessions = ChatSessionManager(
+    max_sessions=config.CHAT_SESSION_MAX,
+    idle_ttl_seconds=config.CHAT_SESSION_IDLE_SECONDS,
+    max_history_turns=config.CHAT_SESSION_MAX_HISTORY_TURNS,
 )
 
+# --- Request Coalescing ---
+# Identical workflows already in flight (e.g. the same dashboard request fired from
+# several tabs) share one execution; every waiter receives the same output object.
+workflow_flight = SingleFlight()
+_inflight_runs: Dict[Tuple, WorkflowRun] = {} # Lets coalesced callers subscribe to the shared run's progress
+
+def workflow_coalescing_key(input_data: RecruitingWorkflowInput) -> Tuple:
+    """ Identifies equivalent workflow requests. The password is included only as a keyed hash. """
+    return (
+        input_data.username,
+        hash_secret(input_data.password),
+        input_data.mode or config.WORKFLOW_MODE,
+        tuple(search_cache_key(spec.title, spec.skills) for spec in input_data.search_specs()),
+        input_data.bypass_cache,
+        input_data.max_candidates,
+        input_data.session_id,
+    )
+
+def coalescing_stats() -> Dict[str, int]:
+    return {
+        "workflows_executed": workflow_flight.calls,
+        "workflows_coalesced": workflow_flight.shared,
+    }
+
 # --- Agent Interaction Logic ---
-async def run_hr_workflow(input_data: RecruitingWorkflowInput) -> RecruitingWorkflowOutput:
+async def run_hr_workflow(
+    input_data: RecruitingWorkflowInput,
+    on_event: Optional[EventListener] = None,
+) -> RecruitingWorkflowOutput:
     """
-    Invokes the ADK agent to perform the recruiting workflow.
+    Runs the recruiting workflow in the requested mode, coalescing identical in-flight requests.
     This function acts as the entry point for the agent's task.
+    `on_event` receives progress events (login, search, per-candidate saves) as they happen.
+    """
+    key = workflow_coalescing_key(input_data) if config.WORKFLOW_COALESCING_ENABLED else None
+    # A shared run is stored exactly while its flight is in flight: both are dropped in the same done callback
+    run = _inflight_runs.get(key) if key else None
+    if run is None:
+        run = WorkflowRun(bypass_cache=input_data.bypass_cache, max_candidates=input_data.max_candidates)
+        if key:
+            _inflight_runs[key] = run
+    else:
+        logger.info(f"Coalescing workflow request for user: {input_data.username}, title: {input_data.title} with in-flight run")
+
+    if on_event:
+        run.subscribe(on_event)
+    try:
+        if key:
+            output = await workflow_flight.do(
+                key, lambda: _execute_workflow(input_data, run), on_done=lambda: _inflight_runs.pop(key, None)
+            )
+        else:
+            output = await _execute_workflow(input_data, run)
+    finally:
+        # The caller may have gone away (e.g. a disconnected SSE client) while a coalesced run continues
+        if on_event:
+            run.unsubscribe(on_event)
+
+    if input_data.include_timings:
+        # Timings are always collected on the run; only callers that asked get them (the output may be shared)
+        output = output.copy(update={"timings": WorkflowTimings(**run.timings())})
+    return output
+
+async def _execute_workflow(input_data: RecruitingWorkflowInput, run: WorkflowRun) -> RecruitingWorkflowOutput:
+    mode = input_data.mode or config.WORKFLOW_MODE
+    # Tools called during the run, by code or by the LLM, record their outcomes on it
+    started = time.monotonic()
+    workflows_in_flight.inc()
+    try:
+        # Root span of the workflow's trace; LLM turns, tools and A2A calls become its children
+        with active_run(run), start_span("workflow", **{"workflow.mode": mode, "workflow.title": input_data.title}) as span:
+            run.emit("started", mode=mode, title=input_data.title)
+            if mode == "llm":
+                output = await run_llm_workflow(input_data, run)
+            else:
+                try:
+                    output = await run_deterministic_workflow(input_data)
+                except Exception as e:
+                    logger.exception(f"Error running deterministic workflow: {e}")
+                    output = _failed_output(e)
+            if span:
+                span.set_attribute("workflow.found_candidates", output.found_candidates_count)
+                span.set_attribute("workflow.saved_candidates", output.saved_candidates_count)
+                if output.errors:
+                    span.set_error(output.errors[0])
+            run.emit("completed", result=output.dict())
+            return output
+    finally:
+        run.total_seconds = time.monotonic() - started
+        workflows_in_flight.dec()
+        workflow_duration.observe(run.total_seconds, mode=mode)
+
+async def run_llm_workflow(input_data: RecruitingWorkflowInput, run: WorkflowRun) -> RecruitingWorkflowOutput:
+    """
+    Invokes the ADK agent to perform the recruiting workflow.
+    The LLM decides each tool call based on AGENT_INSTRUCTIONS; the tools record
+    their results on `run`, from which the structured output is built.
     """
     logger.info(f"Starting HR Workflow for user: {input_data.username}, title: {input_data.title}")
 
     # Construct the initial prompt/query for the agent based on the input
     # This tells the agent *what* to do with the provided details, guided by its instructions.
+    additional_searches = "".join(
+        f"Also search for Job Title: {spec.title}, Required Skills: {spec.skills}. "
+        for spec in input_data.searches
+    )
     user_query = (
         f"Please start the recruiting workflow. "
         f"Username: {input_data.username}, Password: [REDACTED], " # Avoid logging/sending raw password if possible
         f"Job Title: {input_data.title}, Required Skills: {input_data.skills}. "
+        f"{additional_searches}"
         f"Remember to use the actual password provided in the input context." # LLM needs access to the password via tools
     )
 
@@ -66,51 +313,76 @@ async def run_hr_workflow(input_data: RecruitingWorkflowInput) -> RecruitingWork
     # Invoke the agent (using chat interaction model for potential future use)
     # The agent will use its instructions and the query to call tools sequentially.
     try:
-        # For a single workflow execution, we start a chat and get the response.
-        chat = hr_agent.start_chat()
+        # The first LLM-mode request builds the agent off the event loop
+        agent = _agent_if_current() or await asyncio.to_thread(get_hr_agent)
         # Pass necessary details implicitly or explicitly depending on ADK version
         # The LLM needs the input_data details to make the *first* tool call (login)
         # Let's assume the LLM can extract parameters from the query for the initial tools
-        response = await chat.send_message_async(user_query, **input_data.dict()) # Pass input for context if needed by ADK version
+        # Only the workflow parameters are passed; execution options (mode, etc.) are not for the LLM
+        llm_context = input_data.dict(include={"username", "password", "title", "skills"})
+        if input_data.session_id:
+            # Continue the caller's chat; sessions are per user and password (as a keyed hash),
+            # so history is never shared with someone who only knows the username and session id
+            session_key = (input_data.username, hash_secret(input_data.password), input_data.session_id)
+            async with chat_sessions.checkout(session_key, agent.start_chat, origin=agent) as chat:
+                response = await _send_turn(chat, user_query, llm_context)
+        else:
+            # For a single workflow execution, we start a chat and get the response.
+            response = await _send_turn(agent.start_chat(), user_query, llm_context)
 
         # --- Process the final response from the agent ---
-        # The agent's final response *should* be the summary requested in the instructions.
-        # We need to parse this response to create the structured RecruitingWorkflowOutput.
-        # This part is highly dependent on how the LLM formats its final answer based on the prompt.
-        # It might require some string parsing or expecting a specific JSON structure in the response content.
-
-        # Example: Simple parsing assuming the LLM provides a text summary.
-        # A more robust solution would be to ask the LLM to format its *final* output as JSON matching RecruitingWorkflowOutput.
+        # Counts and errors come straight from the tool results recorded on the run,
+        # so the LLM's final answer is only used as the narrative message.
         final_message = response.content
         logger.info(f"Agent final response content: {final_message}")
 
-        # Placeholder parsing logic - NEEDS REFINEMENT based on actual LLM output
-        saved_count = 0
-        found_count = 0
-        errors_list = []        
-        # For now, returning raw message and placeholder counts/errors.
-        if "saved" in final_message.lower():
-             # Try to extract numbers
-             import re
-             saved_match = re.search(r"(\d+)\s+candidates?\s+saved", final_message, re.IGNORECASE)
-             found_match = re.search(r"(\d+)\s+candidates?\s+found", final_message, re.IGNORECASE)
-             if saved_match: saved_count = int(saved_match.group(1))
-             if found_match: found_count = int(found_match.group(1))
-        if "error" in final_message.lower():
-            errors_list.append("Errors occurred during the workflow. Check agent logs or full response.")
-
+        if config.LLM_RESULT_SOURCE == "text":
+            return _output_from_summary_text(final_message)
         return RecruitingWorkflowOutput(
             message=final_message,
-            saved_candidates_count=saved_count,
-            found_candidates_count=found_count,
-            errors=errors_list
+            saved_candidates_count=run.count_saves("saved"),
+            found_candidates_count=run.found_count,
+            failed_candidates_count=run.count_saves("error"),
+            skipped_candidates_count=run.count_saves("skipped"),
+            errors=run.errors
         )
 
     except Exception as e:
         logger.exception(f"Error invoking ADK agent workflow: {e}")
-        return RecruitingWorkflowOutput(
-            message=f"Workflow failed: {e}",
-            saved_candidates_count=0,
-            found_candidates_count=0,
-            errors=[f"Critical agent error: {e}"]
-        )
\ No newline at end of file
+        return _failed_output(e)
+
+def _failed_output(error: Exception) -> RecruitingWorkflowOutput:
+    """ Output of a workflow that raised; the 'Critical agent error' prefix makes /run_workflow answer 500. """
+    return RecruitingWorkflowOutput(
+        message=f"Workflow failed: {error}",
+        saved_candidates_count=0,
+        found_candidates_count=0,
+        errors=[f"Critical agent error: {error}"]
+    )
+
+async def _send_turn(chat, user_query: str, llm_context: Dict[str, Any]):
+    """ Sends one message to the agent, timed and traced as an LLM turn. """
+    turn_started = time.monotonic()
+    try:
+        with start_span("llm.turn", **{"llm.model": config.AGENT_MODEL_NAME}), timed_step("llm"):
+            return await chat.send_message_async(user_query, **llm_context) # Pass input for context if needed by ADK version
+    finally:
+        llm_turn_duration.observe(time.monotonic() - turn_started)
+
+# --- Legacy Summary Parsing ---
+# Used only with LLM_RESULT_SOURCE=text, where the LLM reports the counts in its summary.
+_SAVED_COUNT_PATTERN = re.compile(r"(\d+)\s+candidates?\s+saved", re.IGNORECASE)
+_FOUND_COUNT_PATTERN = re.compile(r"(\d+)\s+candidates?\s+found", re.IGNORECASE)
+
+def _output_from_summary_text(final_message: str) -> RecruitingWorkflowOutput:
+    saved_match = _SAVED_COUNT_PATTERN.search(final_message)
+    found_match = _FOUND_COUNT_PATTERN.search(final_message)
+    errors_list = []
+    if "error" in final_message.lower():
+        errors_list.append("Errors occurred during the workflow. Check agent logs or full response.")
+    return RecruitingWorkflowOutput(
+        message=final_message,
+        saved_candidates_count=int(saved_match.group(1)) if saved_match else 0,
+        found_candidates_count=int(found_match.group(1)) if found_match else 0,
+        errors=errors_list
+    )
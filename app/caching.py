@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Per-process key for hashing secrets held in memory. Hashes cannot be compared
+# across processes or reversed offline, and plaintext passwords are never stored.
+_SECRET_HASH_KEY = os.urandom(32)
+
+def hash_secret(secret: str) -> str:
+    """Returns a keyed SHA-256 digest of a secret, for equality checks only."""
+    return hmac.new(_SECRET_HASH_KEY, secret.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+# --- Single-Flight ---
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key: while a call for a key is in
+    flight, later callers await the same task instead of starting their own.
+    The shared task is shielded, so a cancelled waiter does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0   # Calls that started a new execution
+        self.shared = 0  # Calls that joined an execution already in flight
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """
+        Awaits the in-flight call for `key`, starting `fn()` if there is none.
+        `on_done` (used only when this call starts the execution) runs as the key is
+        forgotten, so state kept alongside the flight never outlives it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t, on_done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future, on_done: Optional[Callable[[], None]] = None):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            if on_done:
+                on_done()
+        if not task.cancelled() and task.exception() is not None:
+            # Mark the exception as retrieved even if every waiter was cancelled
+            logger.debug(f"Single-flight call for {key!r} failed: {task.exception()}")
+
+
+# --- LRU Cache with TTL ---
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire after `ttl_seconds`.
+    Tracks hit/miss counts for observability.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# --- Auth Token Cache ---
+@dataclass
+class _CachedToken:
+    token: str
+    password_hash: str
+    expires_at: float  # time.monotonic() deadline
+
+
+class AuthTokenCache:
+    """
+    In-process cache of auth tokens keyed by username.
+    - Entries store a keyed hash of the password, never the plaintext; a token is
+      only returned to callers presenting the same password.
+    - Expiry honours the auth service's 'expires_in' and otherwise uses `ttl_seconds`.
+    - Concurrent logins for the same user and password share one downstream call.
+    - Refresh is triggered by use: a token used within `refresh_window_seconds` of
+      expiry is returned and a new one fetched in the background (single-flight).
+      Tokens nobody uses in that window just expire; no timer refreshes them, as
+      that would require keeping the plaintext password.
+    """
+
+    def __init__(self, ttl_seconds: float, refresh_window_seconds: float, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_window_seconds = refresh_window_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, _CachedToken] = {}
+        self._flight = SingleFlight()
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get_token(
+        self,
+        username: str,
+        password: str,
+        login: Callable[[str, str], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Returns a LoginOutput-shaped dict, calling `login` only when no valid token is cached."""
+        password_hash = hash_secret(password)
+        entry = self._entries.get(username)
+        now = time.monotonic()
+
+        if entry and entry.password_hash == password_hash and now < entry.expires_at:
+            self.hits += 1
+            if now >= entry.expires_at - self.refresh_window_seconds:
+                self._refresh_in_background(username, password, password_hash, login)
+            return {"success": True, "token": entry.token, "expires_in": int(entry.expires_at - now)}
+
+        self.misses += 1
+        return await self._flight.do(
+            (username, password_hash),
+            lambda: self._login_and_store(username, password, password_hash, login),
+        )
+
+    def invalidate(self, username: str):
+        self._entries.pop(username, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def _login_and_store(self, username, password, password_hash, login) -> Dict[str, Any]:
+        result = await login(username, password)
+        if result.get("success") and result.get("token"):
+            ttl = result.get("expires_in") or self.ttl_seconds
+            if len(self._entries) >= self.max_entries and username not in self._entries:
+                # Evict the oldest entry (dicts keep insertion order)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[username] = _CachedToken(
+                token=result["token"],
+                password_hash=password_hash,
+                expires_at=time.monotonic() + float(ttl),
+            )
+            return {"success": True, "token": result["token"], "expires_in": int(ttl)}
+        # Failed logins are never cached
+        return result
+
+    def _refresh_in_background(self, username, password, password_hash, login):
+        key = (username, password_hash)
+        if self._flight.in_flight(key):
+            return
+        self.refreshes += 1
+        logger.debug(f"Refreshing auth token for {username}, used close to expiry")
+        task = asyncio.ensure_future(
+            self._flight.do(key, lambda: self._login_and_store(username, password, password_hash, login))
+        )
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# --- Saved Candidate Registry ---
+class SavedIdRegistry:
+    """
+    Ids of candidates already saved to the db service, so re-running a search
+    does not re-save the same people. Holds at most `max_entries` ids, dropping
+    the least recently seen. If `path` is set, ids are also appended to that file
+    (from a worker thread, off the event loop) and the newest reloaded on startup.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100_000):
+        self.path = path or None
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self._write_lock = asyncio.Lock()
+        self.skipped = 0  # Saves avoided because the id was already known
+        if self.path and os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        for candidate_id in lines:
+            self._remember(candidate_id)
+        if len(lines) > len(self._ids):
+            # Rewrite the file with just the ids kept, so it does not grow without bound
+            self._write(list(self._ids), mode="w")
+        logger.info(f"Loaded {len(self._ids)} saved candidate ids from {self.path}")
+
+    def __contains__(self, candidate_id: str) -> bool:
+        if candidate_id not in self._ids:
+            return False
+        self._ids.move_to_end(candidate_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def mark_skipped(self):
+        """Counts a save avoided because the candidate was already saved."""
+        self.skipped += 1
+
+    async def add_many(self, candidate_ids: Iterable[str]):
+        new_ids = [i for i in dict.fromkeys(candidate_ids) if i and i not in self._ids]
+        if not new_ids:
+            return
+        for candidate_id in new_ids:
+            self._remember(candidate_id)
+        if self.path:
+            async with self._write_lock:
+                await asyncio.to_thread(self._write, new_ids)
+
+    def _remember(self, candidate_id: str):
+        self._ids[candidate_id] = None
+        self._ids.move_to_end(candidate_id)
+        if len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def _write(self, candidate_ids: List[str], mode: str = "a"):
+        try:
+            with open(self.path, mode, encoding="utf-8") as f:
+                f.write("".join(f"{i}\n" for i in candidate_ids))
+        except OSError as e:
+            # The in-memory registry still deduplicates for this process
+            logger.warning(f"Could not persist saved candidate ids to {self.path}: {e}")
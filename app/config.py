@@ -15,4 +15,160 @@ GCP_LOCATION = os.getenv("GCP_LOCATION", "us-central1")
 AGENT_MODEL_NAME = os.getenv("AGENT_MODEL_NAME", "gemini-1.5-flash-001") # Or other suitable Gemini model
 
 # A simple identifier for JSON-RPC requests initiated by this agent
-JSON_RPC_REQUEST_ID = "hra-adk-agent-1"
\ No newline at end of file
+JSON_RPC_REQUEST_ID = "hra-adk-agent-1"
+
+# All downstream agents this service talks to
+DOWNSTREAM_AGENT_URLS = [AUTH_AGENT_URL, WEBSERVICE_AGENT_URL, DBSERVICE_AGENT_URL]
+
+# HTTP connection pooling for A2A calls (one pool per downstream agent)
+A2A_TIMEOUT_SECONDS = float(os.getenv("A2A_TIMEOUT_SECONDS", "15.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30.0"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" # Only used if the 'h2' package is installed
+
+# Workflow execution mode: "deterministic" runs login -> search -> save as direct tool calls,
+# "llm" lets the Gemini agent orchestrate the tools. Can be overridden per request.
+WORKFLOW_MODE = os.getenv("WORKFLOW_MODE", "deterministic")
+# Import the Vertex AI SDK and build the LLM agent in the background at startup instead of on
+# the first LLM-mode request. Defaults to on only when LLM mode is the default.
+AGENT_PRELOAD = os.getenv("AGENT_PRELOAD", "true" if WORKFLOW_MODE == "llm" else "false").lower() == "true"
+# Agent prompt sent with every LLM turn: "full" instructions and tool schema descriptions, or
+# "compact" minimized instructions and tool declarations without field descriptions.
+# `python -m app.prompt_budget` prints the token cost of each mode.
+PROMPT_MODE = os.getenv("PROMPT_MODE", "full")
+
+# Startup warm-up (runs in the background; /ready returns 503 until it finishes):
+# resolve every downstream agent's host and open WARMUP_CONNECTIONS_PER_DOWNSTREAM pooled
+# connections to it, and with WARMUP_MODEL_PING also send the LLM agent one cheap message.
+# The service is marked ready after WARMUP_TIMEOUT_SECONDS even if warm-up is incomplete.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_CONNECTIONS_PER_DOWNSTREAM = int(os.getenv("WARMUP_CONNECTIONS_PER_DOWNSTREAM", "2"))
+WARMUP_MODEL_PING = os.getenv("WARMUP_MODEL_PING", "false").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "10"))
+
+# LLM chat sessions reused by requests that pass a session_id: at most CHAT_SESSION_MAX are
+# kept, sessions idle for CHAT_SESSION_IDLE_SECONDS are dropped, and each keeps the history
+# of its last CHAT_SESSION_MAX_HISTORY_TURNS turns.
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_IDLE_SECONDS = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "900"))
+CHAT_SESSION_MAX_HISTORY_TURNS = int(os.getenv("CHAT_SESSION_MAX_HISTORY_TURNS", "5"))
+
+# Vertex AI context caching of the agent instructions and tool declarations, so turns are
+# not billed for them as fresh input. Needs google-cloud-aiplatform >= 1.51 and a model and
+# prompt size that support caching; falls back to plain instructions otherwise. The agent is rebuilt with a new cache before the TTL runs out.
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "false").lower() == "true"
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+# Downstream agents' health endpoint, used by the startup warm-up and the deep readiness probes.
+# Deep readiness: a background task GETs HEALTH_PROBE_PATH on every downstream agent
+# every HEALTH_PROBE_INTERVAL_SECONDS; /ready/deep serves the cached results, which are
+# reported as stale after HEALTH_PROBE_STALE_SECONDS without an update
+HEALTH_PROBE_PATH = os.getenv("HEALTH_PROBE_PATH", "/health")
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+HEALTH_PROBE_STALE_SECONDS = float(os.getenv("HEALTH_PROBE_STALE_SECONDS", "30"))
+
+# Save stage of the deterministic workflow: "bulk" sends one create_records call,
+# "concurrent" runs per-candidate create_record calls in parallel with a bounded semaphore,
+# each (retries included) given at most SAVE_TIMEOUT_SECONDS
+SAVE_STRATEGY = os.getenv("SAVE_STRATEGY", "bulk")
+SAVE_CONCURRENCY = int(os.getenv("SAVE_CONCURRENCY", "10"))
+SAVE_TIMEOUT_SECONDS = float(os.getenv("SAVE_TIMEOUT_SECONDS", "10.0"))
+
+# How long a downstream's "method not found" (e.g. no create_records on an older dbservice)
+# or rejected JSON-RPC batch is remembered before the newer call is tried again
+UNSUPPORTED_METHOD_TTL_SECONDS = float(os.getenv("UNSUPPORTED_METHOD_TTL_SECONDS", "300"))
+
+# Auth token cache: tokens are reused per username until expiry. The auth service's
+# 'expires_in' takes precedence over the TTL. Refresh happens on use only: a token
+# used within the last AUTH_TOKEN_REFRESH_ON_USE_WINDOW_SECONDS of its life is
+# returned and a new one fetched in the background. Tokens not used in that window
+# simply expire (there is no timer, as it would mean keeping passwords in memory).
+# AUTH_TOKEN_REFRESH_AHEAD_SECONDS is the old name of the window and still honoured.
+AUTH_TOKEN_CACHE_ENABLED = os.getenv("AUTH_TOKEN_CACHE_ENABLED", "true").lower() == "true"
+AUTH_TOKEN_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_TTL_SECONDS", "300"))
+AUTH_TOKEN_REFRESH_ON_USE_WINDOW_SECONDS = float(
+    os.getenv("AUTH_TOKEN_REFRESH_ON_USE_WINDOW_SECONDS", os.getenv("AUTH_TOKEN_REFRESH_AHEAD_SECONDS", "30"))
+)
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "1000"))
+
+# Search result cache for find_candidates, keyed on normalized title and skills
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+
+# Identical /run_workflow requests in flight at the same time share one execution
+WORKFLOW_COALESCING_ENABLED = os.getenv("WORKFLOW_COALESCING_ENABLED", "true").lower() == "true"
+
+# Candidate save deduplication by CandidateSchema.id. Set SAVED_CANDIDATE_IDS_PATH to a
+# file to keep the saved ids across restarts; otherwise they are kept in memory only.
+# At most SAVED_CANDIDATE_IDS_MAX_ENTRIES ids are remembered (least recently seen go first).
+SAVE_DEDUPE_ENABLED = os.getenv("SAVE_DEDUPE_ENABLED", "true").lower() == "true"
+SAVED_CANDIDATE_IDS_PATH = os.getenv("SAVED_CANDIDATE_IDS_PATH", "")
+SAVED_CANDIDATE_IDS_MAX_ENTRIES = int(os.getenv("SAVED_CANDIDATE_IDS_MAX_ENTRIES", "100000"))
+
+# Where LLM-mode results come from: "tools" builds counts and errors from the tool results
+# recorded during the run (the LLM only writes the narrative message), "text" parses
+# the counts out of the LLM's summary.
+LLM_RESULT_SOURCE = os.getenv("LLM_RESULT_SOURCE", "tools")
+
+# Background workflow jobs (/jobs): worker concurrency, max queued jobs before
+# submissions are rejected with 429 (must be > 0), and how long finished jobs stay pollable
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# Streaming search: candidates from the webservice agent's NDJSON stream are saved in
+# chunks while the search is still running. Memory is bounded by roughly
+# (STREAM_SAVE_WORKERS + STREAM_BUFFER_CHUNKS) * STREAM_SAVE_BATCH_SIZE candidates.
+SEARCH_STREAMING_ENABLED = os.getenv("SEARCH_STREAMING_ENABLED", "false").lower() == "true"
+STREAM_SAVE_BATCH_SIZE = int(os.getenv("STREAM_SAVE_BATCH_SIZE", "25"))
+STREAM_SAVE_WORKERS = int(os.getenv("STREAM_SAVE_WORKERS", "4"))
+STREAM_BUFFER_CHUNKS = int(os.getenv("STREAM_BUFFER_CHUNKS", "4"))
+
+# Page size requested from the webservice agent's search_candidates (0 = unpaged)
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "50"))
+
+# Per-downstream circuit breaker: after CIRCUIT_FAILURE_THRESHOLD consecutive failures
+# (timeouts, connection errors, 5xx) calls to that agent URL fail fast for
+# CIRCUIT_RESET_TIMEOUT_SECONDS, then a single trial call decides whether to close it again
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT_SECONDS = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SECONDS", "30"))
+
+# Adaptive timeouts: each agent URL + method gets ADAPTIVE_TIMEOUT_MULTIPLIER times the
+# ADAPTIVE_TIMEOUT_PERCENTILE of its recent latencies, between ADAPTIVE_TIMEOUT_MIN_SECONDS
+# and A2A_TIMEOUT_SECONDS. A2A_TIMEOUT_SECONDS is used until MIN_SAMPLES calls have completed.
+ADAPTIVE_TIMEOUT_ENABLED = os.getenv("ADAPTIVE_TIMEOUT_ENABLED", "true").lower() == "true"
+ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv("ADAPTIVE_TIMEOUT_PERCENTILE", "99"))
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "3.0"))
+ADAPTIVE_TIMEOUT_MIN_SECONDS = float(os.getenv("ADAPTIVE_TIMEOUT_MIN_SECONDS", "1.0"))
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "20"))
+ADAPTIVE_TIMEOUT_WINDOW = int(os.getenv("ADAPTIVE_TIMEOUT_WINDOW", "200"))
+
+# Retries for transient A2A failures (connection errors, timeouts, 502/503/504), with
+# exponential backoff and full jitter. Max attempts are set per method (1 = no retries);
+# methods not listed here are never retried. create_record / create_records calls without
+# an idempotency key (on every record) are only retried when the request never reached the
+# db service. JSON-RPC batches are retried on transport failures per the policy of their method.
+RETRY_MAX_ATTEMPTS_LOGIN = int(os.getenv("RETRY_MAX_ATTEMPTS_LOGIN", "3"))
+RETRY_MAX_ATTEMPTS_SEARCH_CANDIDATES = int(os.getenv("RETRY_MAX_ATTEMPTS_SEARCH_CANDIDATES", "3"))
+RETRY_MAX_ATTEMPTS_CREATE_RECORD = int(os.getenv("RETRY_MAX_ATTEMPTS_CREATE_RECORD", "3"))
+RETRY_MAX_ATTEMPTS_CREATE_RECORDS = int(os.getenv("RETRY_MAX_ATTEMPTS_CREATE_RECORDS", "3"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.2"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "2.0"))
+# Global retry budget: every call earns RETRY_BUDGET_RATIO retry tokens (up to
+# RETRY_BUDGET_MAX_TOKENS) and each retry spends one, so retries stay a bounded
+# fraction of traffic and cannot snowball into a retry storm during an outage
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "20"))
+
+# Tracing: spans per workflow, LLM turn, tool and A2A call, with W3C 'traceparent'
+# propagated to downstream agents. Traces go to TRACING_OTLP_ENDPOINT (an OTLP/HTTP
+# collector base URL, e.g. http://otel-collector:4318) if set, else are appended to
+# TRACING_FILE_PATH as JSON lines, else logged. Off by default: with no collector or file
+# configured, every trace would otherwise be written to the log at INFO.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "")
@@ -0,0 +1,78 @@
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional 'h2' package (installed via httpx[http2]).
+# Without it we silently stay on HTTP/1.1 keep-alive connections.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _origin(url: str) -> str:
+    """Returns scheme://host:port for a URL, used as the pool key."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ClientRegistry:
+    """
+    Long-lived httpx.AsyncClient instances, one per downstream origin.
+    Each client keeps its own connection pool so a slow or saturated agent
+    cannot starve connections meant for another one.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=config.A2A_TIMEOUT_SECONDS,
+            http2=config.HTTP2_ENABLED and HTTP2_AVAILABLE,
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Returns the pooled client for the URL's origin, creating it on first use."""
+        key = _origin(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._build_client()
+            self._clients[key] = client
+            logger.debug(f"Created pooled HTTP client for {key}")
+        return client
+
+    async def startup(self, urls: Optional[list] = None):
+        """Pre-creates clients for the configured downstream agents."""
+        for url in urls or config.DOWNSTREAM_AGENT_URLS:
+            self.get(url)
+        logger.info(
+            f"HTTP client registry ready for {len(self._clients)} downstream(s) "
+            f"(http2={'on' if config.HTTP2_ENABLED and HTTP2_AVAILABLE else 'off'})"
+        )
+
+    async def aclose(self):
+        """Closes every pooled client. Safe to call more than once."""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing pooled HTTP client: {e}")
+
+
+# Process-wide registry shared by all A2A calls
+client_registry = ClientRegistry()
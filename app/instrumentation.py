@@ -0,0 +1,70 @@
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from .metrics import tool_duration, tool_errors
+from .run_context import current_run
+from .tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+# --- Tool Instrumentation ---
+# Wraps the tool implementations in tools.py, which are called both by the
+# deterministic pipeline and by the LLM agent, so every invocation is measured
+# the same way regardless of who drives the workflow: a latency sample, an error
+# count, a child span of the current trace and a step timing on the current run.
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+def is_error_result(result: Any) -> bool:
+    """True for the error shapes our tools return instead of raising."""
+    if not isinstance(result, dict):
+        return False
+    return bool(result.get("error")) or result.get("status") == "error" or bool(result.get("failed_count"))
+
+def instrument_tool(
+    name: str,
+    step: Optional[str] = None,
+    timing_detail: Optional[Callable[[Any], Dict[str, Any]]] = None,
+) -> Callable[[F], F]:
+    """
+    Records latency, errors and a trace span of an async tool function under `name`.
+    With `step`, each call is also recorded as a timing of that workflow step on the
+    current run, with `timing_detail(result)` as extra fields.
+    """
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            with start_span(f"tool.{name}", **{"tool.name": name}) as span:
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception:
+                    tool_errors.inc(tool=name)
+                    raise
+                finally:
+                    ended = time.monotonic()
+                    tool_duration.observe(ended - started, tool=name)
+                if is_error_result(result):
+                    tool_errors.inc(tool=name)
+                    if span:
+                        span.set_error(str(result.get("error") or "tool returned an error"))
+                run = current_run()
+                if step and run:
+                    run.record_timing(step, started, ended, **(timing_detail(result) if timing_detail else {}))
+                return result
+        return wrapper
+    return decorator
+
+@contextmanager
+def timed_step(step: str) -> Iterator[None]:
+    """Records the block's wall time as a timing of `step` on the current run, if any."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        run = current_run()
+        if run:
+            run.record_timing(step, started, time.monotonic())
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from . import config
+from .agent import run_hr_workflow
+from .schemas import RecruitingWorkflowInput, RecruitingWorkflowOutput
+
+logger = logging.getLogger(__name__)
+
+# --- Background Workflow Jobs ---
+# Long-running workflows are submitted as jobs and executed by a fixed pool of
+# worker tasks, so HTTP requests return immediately instead of holding a
+# connection (and a server worker) for the whole LLM + A2A run.
+
+FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+# Finished jobs are pruned at least this often, even when no new jobs are submitted
+PRUNE_INTERVAL_SECONDS = 60.0
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at JOB_QUEUE_MAX_DEPTH."""
+
+
+@dataclass
+class Job:
+    id: str
+    status: str = "queued"  # queued -> running -> succeeded | failed | cancelled (on shutdown)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[RecruitingWorkflowOutput] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    input_data: Optional[RecruitingWorkflowInput] = field(default=None, repr=False)  # Dropped once the job has run
+    _subscribers: List[asyncio.Queue] = field(default_factory=list, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    def add_event(self, event: Dict[str, Any]):
+        event = {**event, "job_id": self.id, "timestamp": time.time()}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {"events": len(self.events), "last_event": self.events[-1] if self.events else None},
+            "result": self.result.dict() if self.result else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    def __init__(self, workers: int, max_queue_depth: int, retention_seconds: float):
+        # asyncio.Queue treats 0 as unbounded, which would silently disable backpressure
+        if max_queue_depth <= 0:
+            raise ValueError(f"JOB_QUEUE_MAX_DEPTH must be positive, got {max_queue_depth}")
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._prune_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._prune_task = asyncio.create_task(self._prune_periodically())
+        logger.info(f"Started {self.workers} workflow job worker(s), queue depth {self.max_queue_depth}")
+
+    async def stop(self):
+        """Stops the workers. Running and still-queued jobs end as 'cancelled', with a final event."""
+        tasks = self._worker_tasks + ([self._prune_task] if self._prune_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._prune_task = None
+        while self._queue is not None and not self._queue.empty():
+            self._cancel(self._queue.get_nowait())
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, input_data: RecruitingWorkflowInput) -> Job:
+        """Queues a workflow run and returns its job immediately. Raises JobQueueFull for backpressure."""
+        if self._queue is None:
+            raise RuntimeError("JobManager has not been started")
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, input_data=input_data)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queue_depth} jobs waiting)")
+        self._jobs[job.id] = job
+        job.add_event({"event": "queued"})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def stream(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+        """Yields the job's events so far, then new ones as they happen, until the job finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        # Snapshot and subscribe without awaiting in between, so no event is missed or repeated
+        backlog = list(job.events)
+        job._subscribers.append(queue)
+        try:
+            for event in backlog:
+                yield event
+            if job.done:
+                return
+            while True:
+                event = await queue.get()
+                yield event
+                if event["event"] in FINAL_STATUSES:
+                    return
+        finally:
+            job._subscribers.remove(queue)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        input_data, job.input_data = job.input_data, None
+        job.status = "running"
+        job.started_at = time.time()
+        job.add_event({"event": "running"})
+        try:
+            job.result = await run_hr_workflow(input_data, on_event=job.add_event)
+            critical = job.result.errors and "Critical agent error" in job.result.errors[0]
+            job.status = "failed" if critical else "succeeded"
+            job.error = job.result.message if critical else None
+        except asyncio.CancelledError:
+            self._cancel(job)
+            raise
+        except Exception as e:
+            logger.exception(f"Workflow job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.time()
+        job.add_event({"event": job.status, "error": job.error})
+
+    def _cancel(self, job: Job):
+        job.input_data = None
+        job.status = "cancelled"
+        job.error = "Job cancelled: the service is shutting down"
+        job.finished_at = time.time()
+        job.add_event({"event": job.status, "error": job.error})
+
+    async def _prune_periodically(self):
+        while True:
+            await asyncio.sleep(min(PRUNE_INTERVAL_SECONDS, self.retention_seconds))
+            self._prune()
+
+    def _prune(self):
+        """Forgets finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager(
+    workers=config.JOB_WORKERS,
+    max_queue_depth=config.JOB_QUEUE_MAX_DEPTH,
+    retention_seconds=config.JOB_RETENTION_SECONDS,
+)
@@ -1,18 +1,50 @@
+import asyncio
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from .http_clients import client_registry
 from .schemas import RecruitingWorkflowInput, RecruitingWorkflowOutput, JSONRPCRequest # Re-using JSONRPCRequest for potential future A2A *into* this agent
-from .agent import run_hr_workflow # Import the function that runs the agent workflow
+from .agent import chat_sessions, run_hr_workflow, coalescing_stats # Import the function that runs the agent workflow
+from .jobs import job_manager, JobQueueFull
+from .probes import downstream_prober
+from . import metrics
+from .resilience import downstream_stats, retry_budget
+from .tools import search_cache, auth_token_cache, saved_candidate_ids
+from .warmup import warmup
 
 # Basic Logging Setup (customize as needed)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# --- Application Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pooled, keep-alive HTTP clients for the downstream agents once per process
+    await client_registry.startup()
+    await job_manager.start()
+    # Warm up downstream connections (and optionally the model) without delaying startup;
+    # /ready reports 503 until this finishes
+    warmup_task = asyncio.create_task(warmup.run())
+    downstream_prober.start()
+    try:
+        yield
+    finally:
+        if not warmup_task.done():
+            warmup_task.cancel()
+        await downstream_prober.stop()
+        await job_manager.stop()
+        await client_registry.aclose()
+
 app = FastAPI(
     title="HR Recruiting Assistant (ADK)",
     description="An agent powered by Google ADK to automate HR recruiting tasks.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- REST Endpoint to trigger the workflow ---
@@ -23,6 +55,7 @@ async def trigger_workflow(input_data: RecruitingWorkflowInput):
     Takes username, password, title, and skills as input.
     """
     logger.info(f"Received request to run workflow for title: {input_data.title}")
+    started = time.monotonic()
     try:
         result = await run_hr_workflow(input_data)
         # Check if the result indicates a failure within the workflow controlled by the agent
@@ -32,6 +65,86 @@ async def trigger_workflow(input_data: RecruitingWorkflowInput):
     except Exception as e:
         logger.exception("Unhandled exception during workflow trigger")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+    finally:
+        metrics.http_request_duration.observe(time.monotonic() - started, endpoint="/run_workflow")
+
+# --- Server-Sent Events Helpers ---
+# Disable proxy buffering so each event reaches the client as soon as it is emitted
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Formats an event dict as one Server-Sent Events message."""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def sse_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield format_sse(event)
+
+async def workflow_events(input_data: RecruitingWorkflowInput) -> AsyncIterator[Dict[str, Any]]:
+    """Runs the workflow and yields its progress events as the tools complete, ending with 'completed'."""
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(run_hr_workflow(input_data, on_event=queue.put_nowait))
+    try:
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            await asyncio.wait({next_event, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                # The workflow ended without a 'completed' event, i.e. it raised
+                next_event.cancel()
+                while not queue.empty():
+                    yield queue.get_nowait()
+                error = task.exception()
+                logger.error(f"Streamed workflow failed: {error}")
+                yield {"event": "error", "error": f"Internal server error: {error}"}
+                return
+            event = next_event.result()
+            yield event
+            if event["event"] == "completed":
+                return
+    finally:
+        # Client went away: stop waiting on the workflow (a coalesced run continues for other callers)
+        if not task.done():
+            task.cancel()
+
+@app.post("/run_workflow/stream")
+async def stream_workflow(input_data: RecruitingWorkflowInput):
+    """
+    Runs the HR recruiting workflow and streams progress as Server-Sent Events:
+    started, login, search, one save event per candidate, then completed with the summary.
+    """
+    logger.info(f"Received request to stream workflow for title: {input_data.title}")
+    return StreamingResponse(sse_stream(workflow_events(input_data)), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- Asynchronous Job Endpoints ---
+@app.post("/jobs", status_code=202)
+async def submit_job(input_data: RecruitingWorkflowInput):
+    """
+    Queues the HR recruiting workflow and returns a job id immediately.
+    Poll /jobs/{job_id} or stream /jobs/{job_id}/events for progress.
+    """
+    try:
+        job = job_manager.submit(input_data)
+    except JobQueueFull as e:
+        logger.warning(f"Rejecting workflow job for title {input_data.title}: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    logger.info(f"Queued workflow job {job.id} for title: {input_data.title}")
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Returns the status, progress and (once finished) result of a workflow job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Streams a job's progress events as Server-Sent Events until it finishes."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(sse_stream(job_manager.stream(job)), media_type="text/event-stream", headers=SSE_HEADERS)
 
 # --- (Optional) A2A Endpoint ---
 # If this agent needs to be called by *other* agents via JSON-RPC
@@ -90,8 +203,96 @@ async def handle_a2a(rpc_req: JSONRPCRequest):
 
 @app.get("/health")
 async def health():
-    """Simple health check endpoint."""
-    return {"status": "ok", "service": "hr_recruiting_assistant_adk"}
+    """Liveness check. Reports 'warming' (still 200) until the startup warm-up has finished."""
+    return {"status": "ok" if warmup.ready else "warming", "service": "hr_recruiting_assistant_adk"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness check for orchestrators: 503 until the startup warm-up has finished."""
+    body = {"service": "hr_recruiting_assistant_adk", **warmup.to_dict()}
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=body)
+
+@app.get("/ready/deep")
+async def deep_ready():
+    """
+    Readiness including every downstream agent: 503 unless warm-up has finished and the
+    latest cached probe of each agent succeeded. Never calls the downstreams itself.
+    """
+    downstreams = downstream_prober.status()
+    breakers = downstream_stats()
+    for url, result in downstreams.items():
+        if url in breakers:
+            result["circuit"] = breakers[url]["state"]
+    is_ready = warmup.ready and downstream_prober.all_up
+    body = {
+        "status": "ready" if is_ready else "not_ready",
+        "service": "hr_recruiting_assistant_adk",
+        "warmup": warmup.status,
+        "downstreams": downstreams,
+    }
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+@app.get("/stats")
+async def stats():
+    """Runtime counters for request coalescing, caches, jobs, chat sessions and downstream circuit breakers."""
+    return {
+        "coalescing": coalescing_stats(),
+        "search_cache": {"hits": search_cache.hits, "misses": search_cache.misses, "size": len(search_cache)},
+        "auth_token_cache": {
+            "hits": auth_token_cache.hits,
+            "misses": auth_token_cache.misses,
+            "refreshes": auth_token_cache.refreshes,
+        },
+        "saved_candidate_ids": {"known": len(saved_candidate_ids), "skipped_saves": saved_candidate_ids.skipped},
+        "jobs": {"queue_depth": job_manager.queue_depth, "max_queue_depth": job_manager.max_queue_depth},
+        "downstream": downstream_stats(),
+        "retry_budget": {"tokens": round(retry_budget.tokens, 2), "max_tokens": retry_budget.max_tokens},
+        "chat_sessions": chat_sessions.stats(),
+    }
+
+# --- Prometheus Metrics ---
+# Counters that already live on the caches, coalescer and downstream guards are read at scrape time
+metrics.registry.collected(
+    "hr_cache_hits", "Cache lookups served from cache.", "counter",
+    lambda: [({"cache": "search"}, search_cache.hits), ({"cache": "auth_token"}, auth_token_cache.hits)],
+)
+metrics.registry.collected(
+    "hr_cache_misses", "Cache lookups that went to the downstream agent.", "counter",
+    lambda: [({"cache": "search"}, search_cache.misses), ({"cache": "auth_token"}, auth_token_cache.misses)],
+)
+metrics.registry.collected(
+    "hr_saves_skipped", "Candidate saves skipped because the candidate was already saved.", "counter",
+    lambda: [({}, saved_candidate_ids.skipped)],
+)
+metrics.registry.collected(
+    "hr_workflows_coalesced", "Workflow requests that joined an identical in-flight run.", "counter",
+    lambda: [({}, coalescing_stats()["workflows_coalesced"])],
+)
+metrics.registry.collected(
+    "hr_a2a_retries", "A2A call retries per downstream agent URL.", "counter",
+    lambda: [({"url": url}, info["retries"]) for url, info in downstream_stats().items()],
+)
+metrics.registry.collected(
+    "hr_circuit_open", "1 if the downstream agent's circuit breaker is open or half-open.", "gauge",
+    lambda: [({"url": url}, int(info["state"] != "closed")) for url, info in downstream_stats().items()],
+)
+metrics.registry.collected(
+    "hr_downstream_up", "1 if the latest cached health probe of the downstream agent succeeded.", "gauge",
+    lambda: [({"url": url}, int(result["status"] == "up")) for url, result in downstream_prober.status().items()],
+)
+metrics.registry.collected(
+    "hr_chat_sessions_reused", "LLM-mode requests that continued an existing chat session.", "counter",
+    lambda: [({}, chat_sessions.reused)],
+)
+metrics.registry.collected(
+    "hr_job_queue_depth", "Workflow jobs waiting for a worker.", "gauge",
+    lambda: [({}, job_manager.queue_depth)],
+)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of latency histograms and runtime counters."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 # Example: To run directly with uvicorn for local testing
 # if __name__ == "__main__":
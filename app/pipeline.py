@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from . import config
+from .instrumentation import timed_step
+from .run_context import current_run
+from .tracing import start_span
+from .tools import (
+    authenticate_user, iter_candidates, search_many, store_candidate, store_candidates,
+    stream_candidates, SearchStreamError, split_already_saved, summarize_save_results
+)
+from .schemas import RecruitingWorkflowInput, RecruitingWorkflowOutput, CandidateSchema
+
+logger = logging.getLogger(__name__)
+
+# --- Deterministic (LLM-free) Workflow ---
+# The recruiting workflow is a fixed Login -> Search -> Save sequence, so when no
+# reasoning is required we call the tool implementations directly instead of
+# letting the LLM decide each step. Results come from the real tool outputs.
+
+async def run_deterministic_workflow(input_data: RecruitingWorkflowInput) -> RecruitingWorkflowOutput:
+    """Runs login -> search -> save as a plain async pipeline and builds the output from tool results."""
+    logger.info(f"Running deterministic HR workflow for user: {input_data.username}, title: {input_data.title}")
+
+    # 1. Authenticate
+    login_result = await authenticate_user(input_data.username, input_data.password)
+    if not login_result.get("success"):
+        error = login_result.get("error", "Authentication failed")
+        return RecruitingWorkflowOutput(
+            message=f"Login failed: {error}. Workflow stopped.",
+            saved_candidates_count=0,
+            found_candidates_count=0,
+            errors=[f"Login error: {error}"]
+        )
+
+    if input_data.searches:
+        # 2. Fan out all title/skills searches at once and merge the results
+        with start_span("pipeline.search", **{"search.specs": len(input_data.search_specs())}), timed_step("search"):
+            candidates, search_error = await _collect_multi_search_candidates(input_data)
+        found_count = len(candidates)
+        # 3. Save the merged candidates
+        save_result = await _traced_save_batch(candidates)
+    elif config.SEARCH_STREAMING_ENABLED:
+        # 2+3. Stream search results straight into the save stage
+        with start_span("pipeline.search_and_save"):
+            found_count, save_result, search_error = await stream_search_and_save(
+                input_data.title, input_data.skills,
+                use_cache=not input_data.bypass_cache, max_candidates=input_data.max_candidates
+            )
+    else:
+        # 2. Search, fetching result pages lazily up to max_candidates
+        with start_span("pipeline.search"), timed_step("search"):
+            candidates, search_error = await _collect_candidates(input_data)
+        found_count = len(candidates)
+        # 3. Save all candidates, either in one bulk call or as bounded concurrent saves
+        save_result = await _traced_save_batch(candidates)
+
+    if search_error and found_count == 0:
+        return RecruitingWorkflowOutput(
+            message=f"Candidate search failed: {search_error}.",
+            saved_candidates_count=0,
+            found_candidates_count=0,
+            errors=[f"Search error: {search_error}"]
+        )
+    if found_count == 0:
+        return RecruitingWorkflowOutput(
+            message=f"No candidates found for '{input_data.title}' with skills '{input_data.skills}'.",
+            saved_candidates_count=0,
+            found_candidates_count=0,
+        )
+    return _summarize_workflow(found_count, save_result, search_error)
+
+async def _collect_candidates(input_data: RecruitingWorkflowInput) -> Tuple[List[CandidateSchema], Optional[str]]:
+    """ Walks the paged search up to max_candidates. Returns the candidates and any search error. """
+    run = current_run()
+    candidates: List[CandidateSchema] = []
+    search_error = None
+    try:
+        async for candidate in iter_candidates(
+            input_data.title, input_data.skills,
+            max_candidates=input_data.max_candidates, use_cache=not input_data.bypass_cache
+        ):
+            candidates.append(candidate)
+            if run:
+                run.record_found(candidate.dict())
+    except SearchStreamError as e:
+        # Keep the pages fetched before the failure; they are still saved
+        search_error = str(e)
+    if run:
+        run.finish_search_stream(len(candidates), search_error)
+    return candidates, search_error
+
+async def _collect_multi_search_candidates(input_data: RecruitingWorkflowInput) -> Tuple[List[CandidateSchema], Optional[str]]:
+    """ Runs every search spec concurrently; results are deduplicated by candidate id. """
+    run = current_run()
+    candidates, errors = await search_many(
+        input_data.search_specs(), use_cache=not input_data.bypass_cache, max_candidates=input_data.max_candidates
+    )
+    search_error = "; ".join(errors) if errors else None
+    if run:
+        for candidate in candidates:
+            run.record_found(candidate.dict())
+        run.finish_search_stream(len(candidates), search_error)
+    return candidates, search_error
+
+async def _traced_save_batch(candidates: List[CandidateSchema]) -> Dict[str, Any]:
+    if not candidates:
+        return summarize_save_results([])
+    with start_span("pipeline.save", **{"save.candidates": len(candidates), "save.strategy": config.SAVE_STRATEGY}):
+        return await _save_batch(candidates)
+
+async def _save_batch(candidates: List[CandidateSchema]) -> Dict[str, Any]:
+    if config.SAVE_STRATEGY == "concurrent":
+        return await save_candidates_concurrently(candidates)
+    return await store_candidates(candidates)
+
+def _summarize_workflow(found_count: int, save_result: Dict[str, Any], search_error: Optional[str] = None) -> RecruitingWorkflowOutput:
+    """ Builds the workflow output from the search count and the save stage results. """
+    run = current_run()
+    errors = [f"Search error: {search_error}"] if search_error else []
+    errors += run.candidate_errors if run else []
+    errors += [
+        f"Save error for {r.get('name')}: {r.get('error')}"
+        for r in save_result["results"] if r.get("status") == "error"
+    ]
+    saved_count = save_result["saved_count"]
+    skipped_count = save_result["skipped_count"]
+    failed_count = save_result["failed_count"]
+
+    return RecruitingWorkflowOutput(
+        message=(
+            f"Workflow {'stopped early' if search_error else 'complete'}: "
+            f"{found_count} candidates found, {saved_count} candidates saved"
+            + (f", {skipped_count} already saved" if skipped_count else "")
+            + (f", {failed_count} failed." if failed_count else ".")
+        ),
+        saved_candidates_count=saved_count,
+        found_candidates_count=found_count,
+        failed_candidates_count=failed_count,
+        skipped_candidates_count=skipped_count,
+        errors=errors
+    )
+
+# --- Streaming Search -> Save Pipeline ---
+
+async def stream_search_and_save(
+    title: str, skills: str, use_cache: bool = True, max_candidates: Optional[int] = None
+) -> Tuple[int, Dict[str, Any], Optional[str]]:
+    """
+    Saves candidates while the search is still streaming them in.
+    Candidates are grouped into chunks of STREAM_SAVE_BATCH_SIZE and handed to
+    STREAM_SAVE_WORKERS save workers through a queue of at most STREAM_BUFFER_CHUNKS
+    chunks, so a slow save stage pauses the search instead of buffering everything.
+    Only counts and failed saves are kept (the save result's 'results' lists just the
+    failures), so memory does not grow with the number of candidates streamed.
+    Returns (found_count, save_result, search_error); candidates saved before a
+    search error are kept.
+    """
+    run = current_run()
+    if run:
+        run.track_candidates = False
+    workers = max(1, config.STREAM_SAVE_WORKERS)
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_BUFFER_CHUNKS)
+    counts = {"saved": 0, "skipped": 0, "failed": 0}
+    failures: Dict[int, List[Dict[str, Any]]] = {}  # Failed saves by chunk index
+    found_count = 0
+    search_error: Optional[str] = None
+
+    async def produce():
+        nonlocal found_count, search_error
+        chunk: List[CandidateSchema] = []
+        chunk_index = 0
+        # The span lives in this task only, so the save workers' spans are not nested under it
+        with start_span("pipeline.search_stream") as span:
+            try:
+                with timed_step("search"):  # Includes time blocked on a full save queue
+                    async for candidate in stream_candidates(title, skills, use_cache=use_cache, max_candidates=max_candidates):
+                        found_count += 1
+                        chunk.append(candidate)
+                        if len(chunk) >= config.STREAM_SAVE_BATCH_SIZE:
+                            await chunks.put((chunk_index, chunk))
+                            chunk, chunk_index = [], chunk_index + 1
+            except SearchStreamError as e:
+                search_error = str(e)
+            except Exception as e:
+                logger.exception(f"Unexpected error while streaming candidates: {e}")
+                search_error = f"An unexpected error occurred: {e}"
+            if span:
+                span.set_attribute("search.found", found_count)
+                if search_error:
+                    span.set_error(search_error)
+        if chunk:
+            await chunks.put((chunk_index, chunk))
+        if run:
+            run.finish_search_stream(found_count, search_error)
+        for _ in range(workers):
+            await chunks.put(None) # One stop signal per save worker
+
+    async def consume():
+        while True:
+            item = await chunks.get()
+            if item is None:
+                return
+            chunk_index, chunk = item
+            try:
+                results = (await _save_batch(chunk))["results"]
+            except Exception as e:
+                # A failed chunk fails its candidates, not the whole stream
+                logger.exception(f"Unexpected error saving streamed candidates: {e}")
+                results = [
+                    {"status": "error", "error": f"An unexpected error occurred: {e}", "name": c.name} for c in chunk
+                ]
+            summary = summarize_save_results(results)
+            counts["saved"] += summary["saved_count"]
+            counts["skipped"] += summary["skipped_count"]
+            counts["failed"] += summary["failed_count"]
+            errors = [r for r in results if r.get("status") not in ("saved", "skipped")]
+            if errors:
+                failures[chunk_index] = errors
+            if run:
+                run.record_save_batch(summary["saved_count"], summary["skipped_count"], summary["failed_count"])
+
+    # If any stage dies the others are cancelled, so the producer never blocks on a queue nobody reads
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(workers)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    save_result = {
+        "results": [r for index in sorted(failures) for r in failures[index]],  # In stream order
+        "saved_count": counts["saved"],
+        "failed_count": counts["failed"],
+        "skipped_count": counts["skipped"],
+    }
+    return found_count, save_result, search_error
+
+# --- Concurrent Save Stage ---
+
+async def save_candidates_concurrently(
+    candidates: List[CandidateSchema],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Saves candidates with parallel store_candidate calls, at most `concurrency` in flight.
+    Each call, retries included, must finish within `timeout` of starting; a save that runs
+    out of time fails as an A2A timeout, so it counts against the db service's circuit breaker
+    and adaptive timeout. Results keep the input order. Already-saved candidates
+    are skipped up front. Returns the same shape as store_candidates.
+    """
+    semaphore = asyncio.Semaphore(concurrency or config.SAVE_CONCURRENCY)
+    timeout = timeout or config.SAVE_TIMEOUT_SECONDS
+
+    async def save_one(candidate: CandidateSchema) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await store_candidate(
+                    candidate.name, candidate.title, candidate.skills, id=candidate.id,
+                    deadline=time.monotonic() + timeout,
+                )
+            except Exception as e:
+                logger.exception(f"Unexpected error saving candidate {candidate.name}: {e}")
+                return {"status": "error", "error": f"An unexpected error occurred: {e}", "name": candidate.name}
+
+    results, pending = split_already_saved(candidates)
+    # gather() preserves input order regardless of completion order
+    saved = await asyncio.gather(*(save_one(c) for _, c in pending))
+    for (index, _), output in zip(pending, saved):
+        results[index] = output
+    return summarize_save_results(results)
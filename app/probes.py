@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .http_clients import _origin, client_registry
+
+logger = logging.getLogger(__name__)
+
+# --- Downstream Health Probes ---
+# A background task probes every downstream agent's health endpoint every
+# HEALTH_PROBE_INTERVAL_SECONDS and caches the outcome. Readiness checks only
+# read the cache, so however often a load balancer polls, each downstream sees
+# at most one probe per interval.
+
+class DownstreamProber:
+    def __init__(self, urls: List[str], interval: float, timeout: float, stale_after: float):
+        self.urls = list(dict.fromkeys(urls))
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Probing {len(self.urls)} downstream agent(s) every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        await asyncio.gather(*(self._probe(url) for url in self.urls))
+
+    async def _probe(self, url: str):
+        probe_url = f"{_origin(url)}{config.HEALTH_PROBE_PATH}"
+        started = time.monotonic()
+        try:
+            response = await client_registry.get(url).get(probe_url, timeout=self.timeout)
+            status = "up" if response.is_success else "down"
+            error = None if response.is_success else f"HTTP {response.status_code}"
+        except Exception as e:
+            status, error = "down", str(e) or type(e).__name__
+        result = {
+            "status": status,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "checked_at": time.time(),
+            "error": error,
+        }
+        previous = self._results.get(url)
+        if previous and previous["status"] != status:
+            logger.warning(f"Downstream {url} is now {status}" + (f": {error}" if error else ""))
+        self._results[url] = result
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Cached probe results per downstream URL; never triggers a probe."""
+        now = time.time()
+        statuses = {}
+        for url in self.urls:
+            result = self._results.get(url)
+            if result is None:
+                statuses[url] = {"status": "unknown"}
+            elif now - result["checked_at"] > self.stale_after:
+                # The prober has stopped updating this entry; do not report an old 'up'
+                statuses[url] = {**result, "status": "stale"}
+            else:
+                statuses[url] = dict(result)
+        return statuses
+
+    @property
+    def all_up(self) -> bool:
+        return all(result["status"] == "up" for result in self.status().values())
+
+
+downstream_prober = DownstreamProber(
+    config.DOWNSTREAM_AGENT_URLS,
+    interval=config.HEALTH_PROBE_INTERVAL_SECONDS,
+    timeout=config.HEALTH_PROBE_TIMEOUT_SECONDS,
+    stale_after=config.HEALTH_PROBE_STALE_SECONDS,
+)
@@ -0,0 +1,84 @@
+import argparse
+import json
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# --- Prompt Token Budget ---
+# The agent instructions and the tool declarations are sent as input with every LLM
+# turn. These helpers measure what each PROMPT_MODE costs: exactly with the model's
+# count_tokens API (needs the Vertex AI SDK and credentials), or estimated offline
+# at ~4 characters per token, which is close enough to compare the two modes.
+
+CHARS_PER_TOKEN = 4
+PROMPT_MODES = ("full", "compact")
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def declarations_text(declarations: List[Dict[str, Any]]) -> str:
+    """ Tool declarations serialized the way they travel to the model: compact JSON. """
+    return json.dumps(declarations, separators=(",", ":"))
+
+def estimate_prompt_tokens(instructions: str, declarations: List[Dict[str, Any]]) -> int:
+    return estimate_tokens(instructions) + estimate_tokens(declarations_text(declarations))
+
+def model_token_counter(model_name: Optional[str] = None) -> Callable[[str], int]:
+    """ count_tokens of the Gemini model as a function; raises if the SDK is not installed. """
+    from vertexai.generative_models import GenerativeModel
+
+    model = GenerativeModel(model_name or config.AGENT_MODEL_NAME)
+    return lambda text: model.count_tokens(text).total_tokens
+
+def prompt_budget(prompt_mode: str, count: Optional[Callable[[str], int]] = None) -> Dict[str, Any]:
+    """
+    Per-turn input tokens of the agent instructions and each tool declaration in
+    `prompt_mode`, counted with `count` (default: the offline estimate).
+    """
+    # Imported here because the agent module imports this one
+    from .agent import build_agent_instructions
+    from .tools import tool_declarations
+
+    count = count or estimate_tokens
+    instructions = build_agent_instructions(prompt_mode)
+    declarations = tool_declarations(prompt_mode)
+    tools = {declaration["name"]: count(declarations_text([declaration])) for declaration in declarations}
+    instruction_tokens = count(instructions)
+    return {
+        "prompt_mode": prompt_mode,
+        "instructions_tokens": instruction_tokens,
+        "tools_tokens": tools,
+        "total_tokens": instruction_tokens + sum(tools.values()),
+        "instructions_chars": len(instructions),
+        "tools_chars": len(declarations_text(declarations)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Token cost of the agent prompt per PROMPT_MODE")
+    parser.add_argument("--exact", action="store_true", help="Count with the model's count_tokens API instead of estimating")
+    parser.add_argument("--json", action="store_true", help="Print the raw budgets as JSON")
+    args = parser.parse_args()
+
+    count = model_token_counter() if args.exact else None
+    budgets = [prompt_budget(mode, count) for mode in PROMPT_MODES]
+    if args.json:
+        print(json.dumps(budgets, indent=2))
+        return
+    method = f"counted by {config.AGENT_MODEL_NAME}" if args.exact else f"estimated at {CHARS_PER_TOKEN} chars/token"
+    print(f"Agent prompt tokens per LLM turn ({method})")
+    for budget in budgets:
+        print(f"\n[{budget['prompt_mode']}] total {budget['total_tokens']}")
+        print(f"  {'instructions':<27} {budget['instructions_tokens']:>6}")
+        for name, tokens in budget["tools_tokens"].items():
+            print(f"  tool {name:<22} {tokens:>6}")
+    full, compact = budgets
+    saved = full["total_tokens"] - compact["total_tokens"]
+    print(f"\ncompact saves {saved} tokens per turn ({saved / full['total_tokens']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
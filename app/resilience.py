@@ -0,0 +1,246 @@
+import logging
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# --- Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Per-downstream circuit breaker.
+    - closed: calls flow; consecutive failures are counted.
+    - open: after `failure_threshold` consecutive failures, calls fail fast for `reset_timeout` seconds.
+    - half_open: one trial call is let through; success closes the circuit, failure re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.rejected = 0  # Calls failed fast while open
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+            logger.info(f"Circuit for {self.name} is half-open, allowing a trial call")
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed after successful trial call")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failure(s); "
+                    f"failing fast for {self.reset_timeout}s"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Frees the trial slot when a call ends without an outcome (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+
+# --- Adaptive Timeouts ---
+class LatencyTracker:
+    """
+    Rolling window of call latencies. The timeout is a high percentile of recent
+    latencies times a safety multiplier, clamped to [min_timeout, max_timeout];
+    until enough samples exist, the configured maximum is used.
+    """
+
+    def __init__(self, window: int, percentile: float, multiplier: float,
+                 min_timeout: float, max_timeout: float, min_samples: int):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def timeout(self) -> float:
+        if len(self._samples) < self.min_samples:
+            return self.max_timeout
+        adaptive = self.latency_percentile(self.percentile) * self.multiplier
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+
+class DownstreamGuard:
+    """Circuit breaker for one downstream URL plus latency trackers for each of its methods."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.breaker = CircuitBreaker(
+            url,
+            failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=config.CIRCUIT_RESET_TIMEOUT_SECONDS,
+        )
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.retries = 0         # Retry attempts made against this URL
+        self.retries_denied = 0  # Retries skipped because the global retry budget was spent
+
+    def allow_request(self) -> bool:
+        return not config.CIRCUIT_BREAKER_ENABLED or self.breaker.allow_request()
+
+    def _tracker(self, method: str) -> LatencyTracker:
+        tracker = self._latency.get(method)
+        if tracker is None:
+            tracker = self._latency[method] = LatencyTracker(
+                window=config.ADAPTIVE_TIMEOUT_WINDOW,
+                percentile=config.ADAPTIVE_TIMEOUT_PERCENTILE,
+                multiplier=config.ADAPTIVE_TIMEOUT_MULTIPLIER,
+                min_timeout=config.ADAPTIVE_TIMEOUT_MIN_SECONDS,
+                max_timeout=config.A2A_TIMEOUT_SECONDS,
+                min_samples=config.ADAPTIVE_TIMEOUT_MIN_SAMPLES,
+            )
+        return tracker
+
+    def timeout(self, method: str) -> float:
+        if not config.ADAPTIVE_TIMEOUT_ENABLED or self.breaker.state == CircuitBreaker.HALF_OPEN:
+            # Trial calls get the full timeout so a slow-but-healthy agent can close the circuit
+            return config.A2A_TIMEOUT_SECONDS
+        return self._tracker(method).timeout()
+
+    def record_success(self, method: str, latency: Optional[float] = None):
+        if latency is not None:
+            self._tracker(method).observe(latency)
+        self.breaker.record_success()
+
+    def record_failure(self, method: str, timed_out_after: Optional[float] = None):
+        if timed_out_after is not None:
+            # Count the timeout as a latency sample so a slowed-down agent raises its own timeout
+            self._tracker(method).observe(timed_out_after)
+        self.breaker.record_failure()
+
+    def record_cancelled(self):
+        self.breaker.release()
+
+    def record_client_error(self):
+        """The agent answered but refused the request (4xx), which says nothing about its health."""
+        self.breaker.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "rejected_calls": self.breaker.rejected,
+            "timeouts": {method: round(self.timeout(method), 3) for method in self._latency},
+            "retries": self.retries,
+            "retries_denied": self.retries_denied,
+        }
+
+
+# --- Retries ---
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+    requires_idempotency_key: bool = False  # Without a key, only retry requests that never reached the server
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based): exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1, base_delay=0.0, max_delay=0.0)
+
+def _retry_policies() -> Dict[str, RetryPolicy]:
+    def policy(max_attempts: int, **kwargs) -> RetryPolicy:
+        return RetryPolicy(
+            max_attempts=max(1, max_attempts),
+            base_delay=config.RETRY_BASE_DELAY_SECONDS,
+            max_delay=config.RETRY_MAX_DELAY_SECONDS,
+            **kwargs,
+        )
+    return {
+        "login": policy(config.RETRY_MAX_ATTEMPTS_LOGIN),
+        "search_candidates": policy(config.RETRY_MAX_ATTEMPTS_SEARCH_CANDIDATES),
+        "create_record": policy(config.RETRY_MAX_ATTEMPTS_CREATE_RECORD, requires_idempotency_key=True),
+        # Safe to resend whole: every record carries its candidate id as idempotency key
+        "create_records": policy(config.RETRY_MAX_ATTEMPTS_CREATE_RECORDS, requires_idempotency_key=True),
+    }
+
+RETRY_POLICIES = _retry_policies()
+
+def retry_policy(method: str) -> RetryPolicy:
+    return RETRY_POLICIES.get(method, NO_RETRY)
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket limiting retries to a fraction of overall calls.
+    Each call deposits `ratio` tokens (capped at `max_tokens`); each retry withdraws one.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def record_call(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+retry_budget = RetryBudget(ratio=config.RETRY_BUDGET_RATIO, max_tokens=config.RETRY_BUDGET_MAX_TOKENS)
+
+
+_guards: Dict[str, DownstreamGuard] = {}
+
+def downstream_guard(url: str) -> DownstreamGuard:
+    """Returns the process-wide guard for a downstream agent URL."""
+    guard = _guards.get(url)
+    if guard is None:
+        guard = _guards[url] = DownstreamGuard(url)
+    return guard
+
+def downstream_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: guard.stats() for url, guard in _guards.items()}
@@ -0,0 +1,186 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Per-Workflow Run State ---
+# Tools record their outcomes on the current run, so the workflow result can be
+# built from what actually happened instead of parsing the LLM's summary text.
+# The run travels in a ContextVar, which reaches tools called by the LLM as well.
+# Each recorded outcome is also emitted as a progress event to any subscribers.
+
+EventListener = Callable[[Dict[str, Any]], None]
+
+@dataclass
+class StepTiming:
+    step: str          # login | search | save | llm
+    started: float     # time.monotonic() timestamps
+    ended: float
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+def _union_seconds(intervals: List[Tuple[float, float]]) -> float:
+    """Total length covered by possibly overlapping intervals."""
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+@dataclass
+class WorkflowRun:
+    bypass_cache: bool = False
+    max_candidates: Optional[int] = None
+    login_succeeded: Optional[bool] = None
+    login_error: Optional[str] = None
+    search_errors: List[str] = field(default_factory=list)
+    invalid_candidates: List[str] = field(default_factory=list)  # Search results skipped as malformed
+    found_ids: Dict[str, None] = field(default_factory=dict)  # Ordered set of candidate ids seen in searches
+    save_status: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Latest save result per candidate
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    step_timings: List[StepTiming] = field(default_factory=list)
+    total_seconds: Optional[float] = None
+    # False for streamed runs: candidates and saves are then only counted, by the pipeline,
+    # so a run's memory does not grow with the number of candidates
+    track_candidates: bool = True
+    _listeners: List[EventListener] = field(default_factory=list)
+
+    def subscribe(self, listener: EventListener):
+        """Adds a progress listener. Events emitted before subscribing are replayed to it first."""
+        for event in self.events:
+            self._notify(listener, event)
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: EventListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, event_type: str, **data):
+        event = {"event": event_type, **data}
+        self.events.append(event)
+        for listener in list(self._listeners):
+            self._notify(listener, event)
+
+    def _notify(self, listener: EventListener, event: Dict[str, Any]):
+        try:
+            listener(event)
+        except Exception as e:
+            # A broken subscriber must never break the workflow itself
+            logger.warning(f"Workflow event listener failed for {event.get('event')}: {e}")
+
+    def record_login(self, result: Dict[str, Any]):
+        self.login_succeeded = bool(result.get("success"))
+        self.login_error = None if self.login_succeeded else result.get("error", "Authentication failed")
+        self.emit("login", success=self.login_succeeded, error=self.login_error)
+
+    def record_search(self, result: Dict[str, Any]):
+        if result.get("error"):
+            self.search_errors.append(result["error"])
+        candidates = result.get("candidates", [])
+        for candidate in candidates:
+            self.record_found(candidate)
+        self.emit("search", found=len(candidates), error=result.get("error"))
+
+    def record_found(self, candidate: Dict[str, Any]):
+        """Records one candidate from a search, e.g. as it arrives on a stream."""
+        if not self.track_candidates:
+            return
+        self.found_ids[candidate.get("id") or candidate.get("name")] = None
+
+    def record_invalid_candidate(self, error: str):
+        """Records a malformed candidate from a search result that was skipped."""
+        self.invalid_candidates.append(error)
+
+    def finish_search_stream(self, found: int, error: Optional[str] = None):
+        """Completes a streamed or paged search whose candidates were recorded one by one."""
+        if error:
+            self.search_errors.append(error)
+        self.emit("search", found=found, error=error)
+
+    def record_save(self, key: str, result: Dict[str, Any]):
+        if not self.track_candidates:
+            return
+        # A later save for the same candidate (e.g. an LLM retry) replaces the earlier result
+        self.save_status[key] = result
+        self.emit("save", candidate=result.get("name"), status=result.get("status"), error=result.get("error"))
+
+    def record_save_batch(self, saved: int, skipped: int, failed: int):
+        """Reports a batch of saves by count, for runs that do not track candidates one by one."""
+        self.emit("save_batch", saved=saved, skipped=skipped, failed=failed)
+
+    def record_timing(self, step: str, started: float, ended: float, **detail):
+        self.step_timings.append(StepTiming(step, started, ended, detail))
+
+    def step_seconds(self, step: str) -> float:
+        return _union_seconds([(t.started, t.ended) for t in self.step_timings if t.step == step])
+
+    def timings(self) -> Dict[str, Any]:
+        """Wall time breakdown in the WorkflowTimings shape. Overlapping calls of a step are counted once."""
+        llm_turns = [t for t in self.step_timings if t.step == "llm"]
+        llm_seconds = None
+        if llm_turns:
+            # Thinking time is the turn time not covered by the tool calls made during the turn
+            tool_intervals = [(t.started, t.ended) for t in self.step_timings if t.step != "llm"]
+            llm_seconds = sum(
+                (turn.ended - turn.started) - _union_seconds([
+                    (max(start, turn.started), min(end, turn.ended))
+                    for start, end in tool_intervals if start < turn.ended and end > turn.started
+                ])
+                for turn in llm_turns
+            )
+        return {
+            "total_seconds": round(self.total_seconds or 0.0, 4),
+            "login_seconds": round(self.step_seconds("login"), 4),
+            "search_seconds": round(self.step_seconds("search"), 4),
+            "save_seconds": round(self.step_seconds("save"), 4),
+            "llm_seconds": round(llm_seconds, 4) if llm_seconds is not None else None,
+            "saves": [{**t.detail, "seconds": round(t.ended - t.started, 4)} for t in self.step_timings if t.step == "save"],
+        }
+
+    @property
+    def found_count(self) -> int:
+        return len(self.found_ids)
+
+    def count_saves(self, status: str) -> int:
+        return sum(1 for r in self.save_status.values() if r.get("status") == status)
+
+    @property
+    def candidate_errors(self) -> List[str]:
+        return [f"Invalid candidate skipped: {e}" for e in self.invalid_candidates]
+
+    @property
+    def errors(self) -> List[str]:
+        errors = []
+        if self.login_error:
+            errors.append(f"Login error: {self.login_error}")
+        errors.extend(f"Search error: {e}" for e in self.search_errors)
+        errors.extend(self.candidate_errors)
+        errors.extend(
+            f"Save error for {r.get('name')}: {r.get('error')}"
+            for r in self.save_status.values() if r.get("status") == "error"
+        )
+        return errors
+
+
+_current_run: ContextVar[Optional[WorkflowRun]] = ContextVar("current_workflow_run", default=None)
+
+def current_run() -> Optional[WorkflowRun]:
+    """Returns the workflow run the caller is part of, or None outside a workflow."""
+    return _current_run.get()
+
+@contextmanager
+def active_run(run: WorkflowRun) -> Iterator[WorkflowRun]:
+    """Makes `run` the current WorkflowRun for the duration of the block."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
@@ -1,12 +1,30 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+import copy
+import functools
+import types
+import typing
+from pydantic import BaseModel, Field, create_model
+from typing import List, Optional, Dict, Any, Literal, Type
 
 # --- Input Schema for the Agent's Main Intent ---
+class SearchSpec(BaseModel):
+    title: str = Field(..., description="Job title to search for candidates")
+    skills: str = Field(..., description="Comma-separated string of required skills for candidates")
+
 class RecruitingWorkflowInput(BaseModel):
     username: str = Field(..., description="Username for authentication")
     password: str = Field(..., description="Password for authentication (secret)")
     title: str = Field(..., description="Job title to search for candidates")
     skills: str = Field(..., description="Comma-separated string of required skills for candidates")
+    mode: Optional[Literal["deterministic", "llm"]] = Field(None, description="Execution mode; defaults to the WORKFLOW_MODE setting")
+    bypass_cache: bool = Field(False, description="Skip the search result cache and always query the webservice agent")
+    max_candidates: Optional[int] = Field(None, ge=1, description="Maximum number of candidates to fetch and save; no limit if unset")
+    searches: List[SearchSpec] = Field(default_factory=list, description="Additional title/skills searches run alongside the main one; results are merged and deduplicated")
+    include_timings: bool = Field(False, description="Include a per-step wall time breakdown in the output")
+    session_id: Optional[str] = Field(None, description="LLM mode: continue the caller's chat session with this id instead of starting a new chat")
+
+    def search_specs(self) -> List[SearchSpec]:
+        """All searches for this workflow: the main title/skills first, then any additional ones."""
+        return [SearchSpec(title=self.title, skills=self.skills), *self.searches]
 
 # --- Schema for JSON-RPC A2A Calls (if agent needs to receive them) ---
 class JSONRPCRequest(BaseModel):
@@ -25,12 +43,15 @@ class LoginInput(BaseModel):
 class LoginOutput(BaseModel):
     success: bool = Field(..., description="Indicates if login succeeded")
     token: Optional[str] = Field(None, description="Authentication token if successful")
+    expires_in: Optional[int] = Field(None, description="Seconds until the token expires, if known")
     error: Optional[str] = Field(None, description="Error message if failed")
 
 # Search Candidates Tool
 class SearchInput(BaseModel):
     title: str = Field(..., description="Job title to search for")
     skills: str = Field(..., description="Comma-separated string of required skills")
+    page_size: Optional[int] = Field(None, ge=1, description="Maximum number of candidates to return in this page")
+    cursor: Optional[str] = Field(None, description="Cursor from a previous page's next_cursor, to fetch the following page")
     # Note: The token is managed internally by the agent logic, not passed directly into this schema by the LLM usually.
     # It will be retrieved from the agent's state/context after login.
 
@@ -44,6 +65,7 @@ class CandidateSchema(BaseModel):
 
 class SearchOutput(BaseModel):
     candidates: List[CandidateSchema] = Field(..., description="List of candidate objects matching the criteria.")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page of results; empty when there are no more")
     error: Optional[str] = Field(None, description="Error message if search failed")
 
 
@@ -52,15 +74,70 @@ class SaveCandidateInput(BaseModel):
     name: str = Field(..., description="Candidate's full name")
     title: str = Field(..., description="Candidate's job title")
     skills: List[str] = Field(..., description="List of candidate's skills")
+    id: Optional[str] = Field(None, description="Candidate id from the search results, used to avoid saving duplicates")
 
 class SaveCandidateOutput(BaseModel):
-    status: str = Field(..., description="'saved' on success, 'error' on failure")
+    status: str = Field(..., description="'saved' on success, 'skipped' if the candidate was already saved, 'error' on failure")
     name: Optional[str] = Field(None, description="Name of saved candidate")
     error: Optional[str] = Field(None, description="Error message on failure")
 
+# Batch Save Candidates Tool
+class SaveCandidatesInput(BaseModel):
+    candidates: List[CandidateSchema] = Field(..., description="All candidate objects returned by the search, saved in one call")
+
+class SaveCandidatesOutput(BaseModel):
+    results: List[SaveCandidateOutput] = Field(..., description="Per-candidate save status, in input order")
+    saved_count: int = Field(..., description="Number of candidates successfully saved")
+    failed_count: int = Field(..., description="Number of candidates that failed to save")
+    skipped_count: int = Field(0, description="Number of candidates skipped because they were already saved")
+
 # --- Agent's Final Output Schema ---
+class SaveTiming(BaseModel):
+    name: Optional[str] = Field(None, description="Candidate name, or None for a batch save")
+    candidates: int = Field(1, description="Number of candidates in this save call")
+    seconds: float = Field(..., description="Wall time of the save call")
+
+class WorkflowTimings(BaseModel):
+    total_seconds: float = Field(..., description="Wall time of the whole workflow")
+    login_seconds: float = Field(0.0, description="Wall time spent authenticating")
+    search_seconds: float = Field(0.0, description="Wall time spent searching for candidates")
+    save_seconds: float = Field(0.0, description="Wall time spent saving candidates (concurrent saves are counted once)")
+    llm_seconds: Optional[float] = Field(None, description="LLM thinking time: agent turn time not spent in tools (llm mode only)")
+    saves: List[SaveTiming] = Field(default_factory=list, description="Wall time of each save call")
+
 class RecruitingWorkflowOutput(BaseModel):
     message: str = Field(..., description="Summary message of the workflow execution")
     saved_candidates_count: int = Field(..., description="Number of candidates successfully saved")
     found_candidates_count: int = Field(..., description="Number of candidates initially found")
-    errors: List[str] = Field(default_factory=list, description="List of errors encountered during the process")
\ No newline at end of file
+    failed_candidates_count: int = Field(0, description="Number of candidates that failed to save")
+    skipped_candidates_count: int = Field(0, description="Number of candidates skipped because they were already saved")
+    errors: List[str] = Field(default_factory=list, description="List of errors encountered during the process")
+    timings: Optional[WorkflowTimings] = Field(None, description="Per-step timing breakdown, if requested with include_timings")
+
+# --- Compact Tool Schemas ---
+# PROMPT_MODE=compact declares the tools with copies of their schemas that carry no
+# field descriptions; field names and types are usually enough for the LLM and the
+# descriptions are re-sent as tool declarations on every turn.
+
+@functools.lru_cache(maxsize=None)
+def compact_schema(model: Type[BaseModel]) -> Type[BaseModel]:
+    """ A copy of `model` (and of the models nested in it) without field descriptions. """
+    fields = {}
+    for name, field in model.model_fields.items():
+        info = copy.copy(field)
+        info.description = None
+        fields[name] = (_compact_annotation(field.annotation), info)
+    return create_model(model.__name__, __module__=model.__module__, **fields)
+
+def _compact_annotation(annotation: Any) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return compact_schema(annotation)
+    args = typing.get_args(annotation)
+    compact_args = tuple(_compact_annotation(arg) for arg in args)
+    if compact_args == args:
+        return annotation
+    origin = typing.get_origin(annotation)
+    # `X | Y` (types.UnionType) cannot be subscripted; rebuild it as the equivalent typing.Union
+    if origin is typing.Union or origin is types.UnionType:
+        return typing.Union[compact_args]
+    return origin[compact_args]
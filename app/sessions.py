@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+# --- LLM Chat Sessions ---
+# Requests carrying the same session id reuse one chat with the agent instead of
+# starting a new chat per workflow. The manager bounds the number of sessions,
+# drops sessions idle for longer than `idle_ttl_seconds`, and trims each chat's
+# history to its last `max_history_turns` turns so reuse never grows the prompt
+# without limit. Turns of one session are serialized by a per-session lock.
+# A chat is tied to the agent that started it: once the agent is rebuilt (e.g.
+# with a new context cache), the session's next turn starts a fresh chat.
+
+@dataclass
+class ChatSession:
+    chat: Any
+    origin: Any = None  # What started the chat (the agent); a different origin needs a new chat
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    turn_starts: List[int] = field(default_factory=list)  # History length before each kept turn
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ChatSessionManager:
+    def __init__(self, max_sessions: int, idle_ttl_seconds: float, max_history_turns: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_history_turns = max_history_turns
+        self._sessions: "OrderedDict[Hashable, ChatSession]" = OrderedDict()
+        self.reused = 0
+        self.created = 0
+        self.restarted = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @asynccontextmanager
+    async def checkout(self, key: Hashable, new_chat: Callable[[], Any], origin: Any = None) -> AsyncIterator[Any]:
+        """
+        Yields the session's chat for exactly one turn. The chat is created with `new_chat`
+        if the session is new or its chat was started by a different `origin`.
+        """
+        self._evict_idle()
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = ChatSession(chat=new_chat(), origin=origin)
+            self.created += 1
+            self._evict_overflow()
+        self._sessions.move_to_end(key)
+
+        async with session.lock:
+            if session.turns and session.origin is not origin:
+                # Started by an agent that has since been replaced; its history is dropped with it
+                session.chat, session.origin, session.turn_starts = new_chat(), origin, []
+                self.restarted += 1
+            elif session.turns:
+                self.reused += 1
+            history = self._history(session.chat)
+            if history is not None:
+                session.turn_starts.append(len(history))
+            try:
+                yield session.chat
+            finally:
+                session.turns += 1
+                session.last_used = time.monotonic()
+                if history is not None:
+                    self._truncate(session, history)
+
+    def _history(self, chat: Any):
+        history = getattr(chat, "history", None)
+        return history if isinstance(history, list) else None
+
+    def _truncate(self, session: ChatSession, history: list):
+        """Drops whole turns from the start of the history, keeping the last max_history_turns."""
+        if len(session.turn_starts) <= self.max_history_turns:
+            return
+        cut = session.turn_starts[-self.max_history_turns]
+        del history[:cut]
+        session.turn_starts = [start - cut for start in session.turn_starts[-self.max_history_turns:]]
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        expired = [key for key, s in self._sessions.items() if s.last_used < cutoff and not s.lock.locked()]
+        for key in expired:
+            del self._sessions[key]
+        self.evicted += len(expired)
+
+    def _evict_overflow(self):
+        # Least recently used first; a session in use is only forgotten, its current turn still completes
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        self._sessions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._sessions),
+            "created": self.created,
+            "reused": self.reused,
+            "restarted": self.restarted,
+            "evicted": self.evicted,
+        }
@@ -1,76 +1,386 @@
+import asyncio
 import httpx
+import itertools
+import json
 import logging
-from typing import List, Dict, Any
-
-# Assuming google.cloud.aiplatform.private_preview.agents imports Agent and Tool
-# Adjust the import based on the actual ADK package structure if it changes
-from google.cloud.aiplatform.preview.agents import Tool
+import time
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from pydantic import ValidationError
 
 from . import config
+from .caching import AuthTokenCache, SavedIdRegistry, TTLCache
+from .http_clients import client_registry
+from .instrumentation import instrument_tool
+from .metrics import a2a_call_duration, tool_duration, tool_errors
+from .tracing import SPAN_KIND_CLIENT, start_span, traceparent_header
+from .resilience import NO_RETRY, DownstreamGuard, RetryPolicy, downstream_guard, retry_budget, retry_policy
+from .run_context import current_run
 from .schemas import (
     LoginInput, LoginOutput,
-    SearchInput, SearchOutput, CandidateSchema,
-    SaveCandidateInput, SaveCandidateOutput
+    SearchInput, SearchOutput, SearchSpec, CandidateSchema,
+    SaveCandidateInput, SaveCandidateOutput,
+    SaveCandidatesInput, SaveCandidatesOutput,
+    compact_schema,
 )
 
 logger = logging.getLogger(__name__)
 
+# Content type of newline-delimited JSON streams (one JSON object per line)
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Standard JSON-RPC 2.0 error code returned when a downstream agent does not implement a method
+JSONRPC_METHOD_NOT_FOUND = -32601
+# ...and when it cannot parse the request at all, e.g. a batch array it does not accept
+JSONRPC_INVALID_REQUEST = -32600
+
+# unsupported_methods entry for agents that reject JSON-RPC batch requests
+BATCH_METHOD_KEY = "batch"
+
 # --- Helper for JSON-RPC Calls ---
-async def a2a_call(agent_url: str, method: str, params: dict) -> Dict[str, Any]:
-    """Makes an asynchronous JSON-RPC 2.0 call to another agent."""
-    payload = {
+_request_ids = itertools.count(1)
+
+def _next_request_id() -> str:
+    """Returns a process-unique JSON-RPC id so responses can be correlated to requests."""
+    return f"{config.JSON_RPC_REQUEST_ID}-{next(_request_ids)}"
+
+def _rpc_payload(method: str, params: dict) -> Dict[str, Any]:
+    return {
         "jsonrpc": "2.0",
         "method": method,
         "params": params,
-        "id": config.JSON_RPC_REQUEST_ID
+        "id": _next_request_id()
     }
-    logger.debug(f"A2A Call to {agent_url} - Method: {method}, Params: {params}")
-    async with httpx.AsyncClient() as client:
+
+def _parse_rpc_response(agent_url: str, method: str, data: Any) -> Any:
+    """Converts one JSON-RPC response object into the tool-facing result or error dict."""
+    if not isinstance(data, dict):
+        logger.error(f"Invalid JSON-RPC response from {agent_url} (not an object): {data}")
+        return {"error": "Invalid JSON-RPC response structure"}
+    if "error" in data:
+        error_info = data["error"]
+        logger.error(f"A2A Error from {agent_url} calling {method}: {error_info}")
+        # Return a dictionary indicating error, letting the tool handle it
+        return {"error": error_info.get("message", "Unknown A2A error"), "error_details": error_info}
+    elif "result" in data:
+        return data["result"]
+    else:
+        logger.error(f"Invalid JSON-RPC response from {agent_url} (no result or error): {data}")
+        return {"error": "Invalid JSON-RPC response structure"}
+
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+async def a2a_call(agent_url: str, method: str, params: dict, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Makes an asynchronous JSON-RPC 2.0 call to another agent.
+    Calls go through the agent URL's circuit breaker and use its adaptive timeout, so a
+    degraded downstream fails fast instead of stalling every call for the full timeout.
+    Transient failures are retried per the method's RetryPolicy, within the global retry budget.
+    With a `deadline` (a time.monotonic() timestamp), attempts and retries all finish by then;
+    running out of time is a timeout of the call, which counts against the downstream.
+    """
+    guard = downstream_guard(agent_url)
+    policy = retry_policy(method)
+    payload = _rpc_payload(method, params)
+    retry_budget.record_call()
+    attempt = 1
+    while True:
+        if not guard.allow_request():
+            logger.warning(f"Circuit open for {agent_url}, failing {method} fast")
+            return {"error": f"Circuit open for {agent_url}: downstream agent is failing"}
+
+        started = time.monotonic()
+        max_timeout = deadline - started if deadline is not None else None
+        result, error = await _a2a_attempt(guard, agent_url, method, payload, attempt, max_timeout)
+        a2a_call_duration.observe(
+            time.monotonic() - started, url=agent_url, method=method, outcome=_call_outcome(result, error)
+        )
+        if error is None or not _is_retryable(error, policy, params):
+            return result
+        delay = _retry_delay(guard, policy, attempt, method, deadline)
+        if delay is None:
+            return result
+        attempt += 1
+        logger.info(f"Retrying {method} to {agent_url} in {delay:.2f}s (attempt {attempt}/{policy.max_attempts}): {result.get('error')}")
+        await asyncio.sleep(delay)
+
+def _retry_delay(
+    guard: DownstreamGuard, policy: RetryPolicy, attempt: int, method: str, deadline: Optional[float] = None
+) -> Optional[float]:
+    """ Backoff before retrying a failed attempt, or None if it must not be retried. Spends retry budget. """
+    if attempt >= policy.max_attempts:
+        return None
+    if not retry_budget.try_spend():
+        guard.retries_denied += 1
+        logger.warning(f"Retry budget exhausted, not retrying {method} to {guard.url}")
+        return None
+    delay = policy.backoff(attempt)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        logger.warning(f"No time left before the deadline to retry {method} to {guard.url}")
+        return None
+    guard.retries += 1
+    return delay
+
+def _call_outcome(result: Any, error: Optional[Exception]) -> str:
+    """ 'ok', or 'error' for transport failures and JSON-RPC error responses alike. """
+    return "error" if error is not None or (isinstance(result, dict) and "error" in result) else "ok"
+
+def _is_retryable(error: Exception, policy: RetryPolicy, params: dict) -> bool:
+    """ Transient failures are retryable; non-idempotent writes only when the request was never sent. """
+    if isinstance(error, httpx.HTTPStatusError):
+        transient = error.response.status_code in RETRYABLE_STATUS_CODES
+    else:
+        transient = isinstance(error, httpx.RequestError)
+    if not transient:
+        return False
+    if policy.requires_idempotency_key and not _has_idempotency_keys(params):
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+    return True
+
+def _has_idempotency_keys(params: dict) -> bool:
+    """ True if the db service can drop a repeat of this write: the record, or every bulk record, has a key. """
+    records = params.get("records")
+    if isinstance(records, list):
+        return bool(records) and all(isinstance(r, dict) and r.get("idempotency_key") for r in records)
+    return bool(params.get("idempotency_key"))
+
+async def _a2a_attempt(
+    guard: DownstreamGuard, agent_url: str, method: str, payload: dict, attempt: int = 1,
+    max_timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Optional[Exception]]:
+    """ One traced HTTP round trip for a2a_call. Returns the result and, on failure, the exception that caused it. """
+    with start_span(f"a2a {method}", kind=SPAN_KIND_CLIENT, **{
+        "rpc.system": "jsonrpc", "rpc.method": method, "url.full": agent_url, "a2a.attempt": attempt,
+    }) as span:
+        result, error = await _a2a_round_trip(guard, agent_url, method, payload, max_timeout)
+        if span and _call_outcome(result, error) == "error":
+            span.set_error(str(result.get("error")))
+        return result, error
+
+async def _a2a_round_trip(
+    guard: DownstreamGuard, agent_url: str, method: str, payload: dict, max_timeout: Optional[float] = None
+) -> Tuple[Dict[str, Any], Optional[Exception]]:
+    logger.debug(f"A2A Call to {agent_url} - Method: {method}, Params: {payload['params']}")
+    # Reuse the pooled, keep-alive client for this downstream instead of opening a new connection per call
+    client = client_registry.get(agent_url)
+    timeout = guard.timeout(method)
+    if max_timeout is not None:
+        timeout = min(timeout, max_timeout)
+    started = time.monotonic()
+    try:
+        # Propagate the trace context so downstream agents can join the trace
+        response = await client.post(agent_url, json=payload, timeout=timeout, headers=traceparent_header())
+        response.raise_for_status() # Raise HTTP errors
+        data = response.json()
+    except asyncio.CancelledError:
+        guard.record_cancelled()
+        raise
+    except Exception as e:
+        return {"error": _record_failure(guard, agent_url, method, e, timeout)}, e
+    guard.record_success(method, time.monotonic() - started)
+    logger.debug(f"A2A Response from {agent_url} - Method: {method}: {data}")
+    return _parse_rpc_response(agent_url, method, data), None
+
+def _record_failure(guard: DownstreamGuard, agent_url: str, method: str, error: Exception, timeout: float) -> str:
+    """
+    Records a failed A2A request on the agent's guard and returns the error message for the caller.
+    Single calls, batches and streams all classify failures here, so retries and the circuit
+    breaker see them alike: timeouts, connection errors, 5xx and unreadable responses count
+    against the downstream; a 4xx says nothing about its health.
+    """
+    if isinstance(error, httpx.TimeoutException):
+        guard.record_failure(method, timed_out_after=timeout)
+        logger.exception(f"A2A call to {agent_url} for method {method} timed out after {timeout:.2f}s.")
+        return "Request timed out"
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status >= 500:
+            guard.record_failure(method)
+        else:
+            guard.record_client_error()
+        logger.exception(f"A2A call to {agent_url} for method {method} returned HTTP {status}")
+        return f"HTTP error {status} from downstream agent"
+    guard.record_failure(method)
+    if isinstance(error, httpx.RequestError):
+        logger.exception(f"A2A RequestError to {agent_url} for method {method}: {error}")
+        return f"Network or connection error: {error}"
+    logger.exception(f"Unexpected error during A2A call to {agent_url} for method {method}: {error}")
+    return f"An unexpected error occurred: {error}"
+
+async def a2a_batch_call(agent_url: str, calls: List[Tuple[str, dict]]) -> List[Any]:
+    """
+    Sends many (method, params) calls to one agent as a single JSON-RPC 2.0 batch.
+    Returns one result per call, in the order given, each shaped like an a2a_call result.
+    Falls back to concurrent single calls if the downstream rejects batch requests, and
+    keeps doing so for that agent URL while the rejection is remembered in unsupported_methods.
+    """
+    if not calls:
+        return []
+    if len(calls) == 1:
+        return [await a2a_call(agent_url, *calls[0])]
+    if unsupported_methods.get((agent_url, BATCH_METHOD_KEY)):
+        return await _concurrent_single_calls(agent_url, calls)
+
+    guard = downstream_guard(agent_url)
+    payloads = [_rpc_payload(method, params) for method, params in calls]
+    logger.debug(f"A2A Batch Call to {agent_url} - {len(payloads)} requests")
+    batch_method = f"batch:{calls[0][0]}"  # Batches get their own latency window
+    # A batch is retried like its calls would be; mixed-method batches are not retried
+    policy = retry_policy(calls[0][0]) if all(method == calls[0][0] for method, _ in calls) else NO_RETRY
+    retry_budget.record_call()
+    attempt = 1
+    while True:
+        if not guard.allow_request():
+            logger.warning(f"Circuit open for {agent_url}, failing batch of {len(calls)} calls fast")
+            return [{"error": f"Circuit open for {agent_url}: downstream agent is failing"} for _ in calls]
+
+        started = time.monotonic()
         try:
-            response = await client.post(agent_url, json=payload, timeout=15.0)
-            response.raise_for_status() # Raise HTTP errors
-            data = response.json()
-            logger.debug(f"A2A Response from {agent_url} - Method: {method}: {data}")
-
-            if "error" in data:
-                error_info = data["error"]
-                logger.error(f"A2A Error from {agent_url} calling {method}: {error_info}")
-                # Return a dictionary indicating error, letting the tool handle it
-                return {"error": error_info.get("message", "Unknown A2A error"), "error_details": error_info}
-            elif "result" in data:
-                return data["result"]
-            else:
-                logger.error(f"Invalid JSON-RPC response from {agent_url} (no result or error): {data}")
-                return {"error": "Invalid JSON-RPC response structure"}
-
-        except httpx.TimeoutException:
-            logger.exception(f"A2A call to {agent_url} for method {method} timed out.")
-            return {"error": "Request timed out"}
-        except httpx.RequestError as e:
-            logger.exception(f"A2A RequestError to {agent_url} for method {method}: {e}")
-            return {"error": f"Network or connection error: {e}"}
+            data, error, exception = await _batch_attempt(guard, agent_url, batch_method, payloads, attempt)
+        except BatchNotSupported as e:
+            a2a_call_duration.observe(time.monotonic() - started, url=agent_url, method=batch_method, outcome="error")
+            logger.info(f"{agent_url} rejected JSON-RPC batch request ({e}), falling back to concurrent single calls")
+            unsupported_methods.set((agent_url, BATCH_METHOD_KEY), True)
+            return await _concurrent_single_calls(agent_url, calls)
+        a2a_call_duration.observe(
+            time.monotonic() - started, url=agent_url, method=batch_method, outcome="error" if error else "ok"
+        )
+        if data is not None:
+            break
+        if not all(_is_retryable(exception, policy, params) for _, params in calls):
+            return [{"error": error} for _ in calls]
+        delay = _retry_delay(guard, policy, attempt, batch_method)
+        if delay is None:
+            return [{"error": error} for _ in calls]
+        attempt += 1
+        logger.info(f"Retrying {batch_method} to {agent_url} in {delay:.2f}s (attempt {attempt}/{policy.max_attempts}): {error}")
+        await asyncio.sleep(delay)
+
+    responses_by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+    results = []
+    for (method, _), payload in zip(calls, payloads):
+        item = responses_by_id.get(payload["id"])
+        if item is None:
+            logger.error(f"No response for {method} (id {payload['id']}) in batch from {agent_url}")
+            results.append({"error": "Missing response in JSON-RPC batch"})
+        else:
+            results.append(_parse_rpc_response(agent_url, method, item))
+    return results
+
+class BatchNotSupported(Exception):
+    """ The downstream answered a JSON-RPC batch with a sign that it does not take batches. """
+
+async def _batch_attempt(
+    guard: DownstreamGuard, agent_url: str, batch_method: str, payloads: List[dict], attempt: int
+) -> Tuple[Optional[List[Any]], Optional[str], Optional[Exception]]:
+    """
+    One traced POST of a JSON-RPC batch. Returns the response array, or None with the error and
+    its exception. Raises BatchNotSupported if the agent rejected the batch itself.
+    """
+    client = client_registry.get(agent_url)
+    timeout = guard.timeout(batch_method)
+    started = time.monotonic()
+    with start_span(f"a2a {batch_method}", kind=SPAN_KIND_CLIENT, **{
+        "rpc.system": "jsonrpc", "rpc.method": batch_method, "url.full": agent_url,
+        "rpc.batch_size": len(payloads), "a2a.attempt": attempt,
+    }) as span:
+        try:
+            response = await client.post(agent_url, json=payloads, timeout=timeout, headers=traceparent_header())
+            rejection = _batch_rejection(response)
+            if rejection is None:
+                response.raise_for_status()
+                data = response.json()
+        except asyncio.CancelledError:
+            guard.record_cancelled()
+            raise
         except Exception as e:
-            logger.exception(f"Unexpected error during A2A call to {agent_url} for method {method}: {e}")
-            return {"error": f"An unexpected error occurred: {e}"}
+            error = _record_failure(guard, agent_url, batch_method, e, timeout)
+            if span:
+                span.set_error(error)
+            return None, error, e
+        if rejection is not None:
+            # The agent is healthy, it just does not speak batch JSON-RPC
+            guard.record_success(batch_method)
+            if span:
+                span.set_error(rejection)
+            raise BatchNotSupported(rejection)
+    guard.record_success(batch_method, time.monotonic() - started)
+    return data, None, None
 
-# --- ADK Tools ---
+def _batch_rejection(response: httpx.Response) -> Optional[str]:
+    """
+    Why the response shows the agent does not support batches, or None if it does not show that.
+    Only a JSON-RPC 'invalid request'/'method not found' error or a 2xx body that is not an array
+    count; any other error status is an ordinary failure of the call.
+    """
+    if response.is_server_error:
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        return "non-JSON batch response" if response.is_success else None
+    error = body.get("error") if isinstance(body, dict) else None
+    if isinstance(error, dict) and error.get("code") in (JSONRPC_INVALID_REQUEST, JSONRPC_METHOD_NOT_FOUND):
+        return f"JSON-RPC error {error['code']}: {error.get('message', '')}"
+    if response.is_success and not isinstance(body, list):
+        return "batch response is not an array"
+    return None
+
+async def _concurrent_single_calls(agent_url: str, calls: List[Tuple[str, dict]]) -> List[Any]:
+    return await asyncio.gather(*(a2a_call(agent_url, method, params) for method, params in calls))
+
+# --- Caches ---
 
-login_tool = Tool.from_function(
-    name="login_user",
-    description="Authenticates the user with their username and password, returning an access token.",
-    func=lambda input_data: authenticate_user(**input_data), # Wrap async call
-    input_model=LoginInput,
-    output_model=LoginOutput,
+# Tokens are reused across workflow runs until they expire (see AuthTokenCache)
+auth_token_cache = AuthTokenCache(
+    ttl_seconds=config.AUTH_TOKEN_TTL_SECONDS,
+    refresh_window_seconds=config.AUTH_TOKEN_REFRESH_ON_USE_WINDOW_SECONDS,
+    max_entries=config.AUTH_TOKEN_CACHE_MAX_ENTRIES,
 )
+
+# Ids of candidates already saved, so repeated searches do not re-save the same people
+saved_candidate_ids = SavedIdRegistry(config.SAVED_CANDIDATE_IDS_PATH, config.SAVED_CANDIDATE_IDS_MAX_ENTRIES)
+
+# Search results are reused for repeated title/skills searches (see search_cache_key)
+search_cache = TTLCache(max_size=config.SEARCH_CACHE_MAX_ENTRIES, ttl_seconds=config.SEARCH_CACHE_TTL_SECONDS)
+
+# (agent URL, method) pairs a downstream rejected as not implemented. Fallbacks go straight to
+# the older method while an entry lives, instead of paying a failed round trip on every call;
+# entries expire so an upgraded downstream is picked up again.
+unsupported_methods = TTLCache(max_size=64, ttl_seconds=config.UNSUPPORTED_METHOD_TTL_SECONDS)
+
+def search_cache_key(title: str, skills: str) -> Tuple[str, Tuple[str, ...]]:
+    """ Normalizes a search so that e.g. 'Python, SQL' and ' sql,python' share a cache entry. """
+    normalized_skills = sorted({s.strip().lower() for s in skills.split(",") if s.strip()})
+    return (title.strip().lower(), tuple(normalized_skills))
+
+@instrument_tool("authenticate_user", step="login")
 async def authenticate_user(username: str, password: str) -> Dict[str, Any]:
-    """ Tool implementation: Calls the auth_agent's login method. """
+    """ Tool implementation: Returns a cached token for the user or calls the auth_agent's login method. """
+    if config.AUTH_TOKEN_CACHE_ENABLED:
+        result = await auth_token_cache.get_token(username, password, _login)
+    else:
+        result = await _login(username, password)
+    run = current_run()
+    if run:
+        run.record_login(result)
+    return result
+
+async def _login(username: str, password: str) -> Dict[str, Any]:
+    """ Calls the auth_agent's login method. """
     params = {"username": username, "password": password}
     result = await a2a_call(config.AUTH_AGENT_URL, "login", params)
 
     # Process result into LoginOutput format
     if isinstance(result, dict) and "error" not in result:
         if result.get("success") and "token" in result:
-            return {"success": True, "token": result["token"]}
+            output = {"success": True, "token": result["token"]}
+            if result.get("expires_in"):
+                try:
+                    output["expires_in"] = int(result["expires_in"])
+                except (TypeError, ValueError):
+                    # The cache falls back to its default TTL
+                    logger.warning(f"Ignoring invalid expires_in from auth service: {result['expires_in']!r}")
+            return output
         else:
             # Handle login failure reported by the service
             return {"success": False, "error": result.get("error", "Authentication failed")}
@@ -79,44 +389,333 @@ async def authenticate_user(username: str, password: str) -> Dict[str, Any]:
         return {"success": False, "error": result.get("error", "Failed to call authentication service")}
 
 
-search_candidates_tool = Tool.from_function(
-    name="search_for_candidates",
-    description="Searches for candidates based on job title and required skills. Requires prior successful login.",
-    func=lambda input_data: find_candidates(**input_data), # Wrap async call
-    input_model=SearchInput,
-    output_model=SearchOutput,
-)
-async def find_candidates(title: str, skills: str) -> Dict[str, Any]:
-    """ Tool implementation: Calls the webservice_agent's search_candidates method. """
+@instrument_tool("find_candidates", step="search")
+async def find_candidates(
+    title: str,
+    skills: str,
+    use_cache: bool = True,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """ Tool implementation: Calls the webservice_agent's search_candidates method, with a result cache. """
     # NOTE: The token management needs to happen in the *Agent Core* logic.
     # This tool assumes it's called *after* login was successful and the token is available in the agent's context.
     # For this example, we focus on the A2A call itself. A real agent would fetch the token from its state.
-    params = {"title": title, "skills": skills}
+    run = current_run()
+    # LLM-driven tool calls cannot pass these options themselves, so they also come from the current run
+    use_cache = use_cache and not (run and run.bypass_cache)
+    # max_candidates caps the whole run, across every page and search the agent asks for
+    remaining = run.max_candidates - run.found_count if run and run.max_candidates else None
+    if remaining is not None:
+        if remaining <= 0:
+            return {"candidates": [], "next_cursor": None}
+        page_size = min(page_size or remaining, remaining)
+    result = await _search(title, skills, use_cache, page_size, cursor)
+    if remaining is not None and len(result["candidates"]) > remaining:
+        # Downstreams without paging return everything; only hand on what will be saved
+        result["candidates"] = result["candidates"][:remaining]
+    if run:
+        run.record_search(result)
+        if run.max_candidates and run.found_count >= run.max_candidates:
+            # Nothing more will be saved, so do not invite the agent to fetch the next page
+            result["next_cursor"] = None
+    return result
+
+# Instrumented on its own so searches the deterministic pipeline runs (without the
+# find_candidates tool) show up in the tool metrics and traces too
+@instrument_tool("search_candidates")
+async def _search(
+    title: str,
+    skills: str,
+    use_cache: bool,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """ Calls the webservice_agent's search_candidates method for one page, serving repeated searches from search_cache. """
+    cache_key = _search_page_key(title, skills, page_size, cursor) if use_cache and config.SEARCH_CACHE_ENABLED else None
+    cached = _cached_search_page(cache_key)
+    if cached is not None:
+        return cached
+    params = _search_params(title, skills, page_size, cursor)
     result = await a2a_call(config.WEBSERVICE_AGENT_URL, "search_candidates", params)
+    return _parse_search_page(result, cache_key)
+
+def _search_page_key(title: str, skills: str, page_size: Optional[int], cursor: Optional[str]) -> Tuple:
+    return (search_cache_key(title, skills), page_size, cursor)
+
+def _cached_search_page(cache_key: Optional[Tuple]) -> Optional[Dict[str, Any]]:
+    if cache_key is None:
+        return None
+    cached = search_cache.get(cache_key)
+    if cached is None:
+        return None
+    logger.debug(f"Search cache hit for {cache_key}")
+    candidates, next_cursor = cached
+    return {"candidates": [c.dict() for c in candidates], "next_cursor": next_cursor}
+
+def _search_params(title: str, skills: str, page_size: Optional[int], cursor: Optional[str]) -> Dict[str, Any]:
+    params = {"title": title, "skills": skills}
+    if page_size:
+        params["page_size"] = page_size
+    if cursor:
+        params["cursor"] = cursor
+    return params
 
-    if isinstance(result, list): # Success case returns a list directly
-        # Validate structure slightly if needed, Pydantic output_model helps here
-        validated_candidates = [CandidateSchema(**c).dict() for c in result if isinstance(c, dict)]
-        return {"candidates": validated_candidates}
+def _parse_search_page(result: Any, cache_key: Optional[Tuple]) -> Dict[str, Any]:
+    """ Processes a search_candidates result into SearchOutput format, caching it under cache_key if given. """
+    # Paged agents return {"candidates": [...], "next_cursor": ...}; older ones return the full list directly
+    if isinstance(result, dict) and isinstance(result.get("candidates"), list):
+        items, next_cursor = result["candidates"], result.get("next_cursor")
+    elif isinstance(result, list):
+        items, next_cursor = result, None
     elif isinstance(result, dict) and "error" in result:
         return {"candidates": [], "error": result.get("error", "Failed to call search service")}
     else:
         logger.error(f"Search candidates returned unexpected result format: {result}")
         return {"candidates": [], "error": "Invalid response from search service"}
 
+    # Malformed rows are skipped (and reported on the run) rather than failing the whole search
+    validated = [c for c in (_parse_candidate(item) for item in items) if c is not None]
+    if cache_key is not None:
+        search_cache.set(cache_key, (validated, next_cursor))
+    return {"candidates": [c.dict() for c in validated], "next_cursor": next_cursor}
+
+async def iter_candidates(
+    title: str,
+    skills: str,
+    page_size: Optional[int] = None,
+    max_candidates: Optional[int] = None,
+    use_cache: bool = True,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[CandidateSchema]:
+    """
+    Yields candidates page by page, following next_cursor lazily: the next page is only
+    requested once the caller has consumed the current one, and nothing beyond
+    `max_candidates` is fetched. Starts at `cursor` if given. Raises SearchStreamError if a page fails.
+    """
+    page_size = _effective_page_size(page_size, max_candidates)
+    yielded = 0
+    while True:
+        # Only ask for as many candidates as are still wanted
+        request_size = min(page_size, max_candidates - yielded) if max_candidates and page_size else page_size
+        page = await _search(title, skills, use_cache, request_size, cursor)
+        if page.get("error"):
+            raise SearchStreamError(page["error"])
+        for candidate in page["candidates"]:
+            yield CandidateSchema(**candidate)
+            yielded += 1
+            if max_candidates and yielded >= max_candidates:
+                return
+        cursor = page.get("next_cursor")
+        if not cursor or not page["candidates"]:
+            return
+
+def _effective_page_size(page_size: Optional[int], max_candidates: Optional[int]) -> Optional[int]:
+    page_size = page_size or config.SEARCH_PAGE_SIZE or None
+    if max_candidates and page_size:
+        page_size = min(page_size, max_candidates)
+    return page_size
+
+# --- Multi-Search Fan-Out ---
+
+async def search_many(
+    specs: List[SearchSpec],
+    use_cache: bool = True,
+    max_candidates: Optional[int] = None,
+) -> Tuple[List[CandidateSchema], List[str]]:
+    """
+    Runs several title/skills searches in one go and merges the results, dropping
+    candidates already returned by an earlier spec (same CandidateSchema.id).
+    The first page of every uncached search is sent as a single JSON-RPC batch;
+    specs with more pages then follow their cursors concurrently.
+    Returns (candidates, errors) with one error string per failed spec.
+    """
+    # Searches that normalize to the same title/skills are only run once
+    unique_specs: Dict[Tuple, SearchSpec] = {}
+    for spec in specs:
+        unique_specs.setdefault(search_cache_key(spec.title, spec.skills), spec)
+    specs = list(unique_specs.values())
+
+    use_cache = use_cache and config.SEARCH_CACHE_ENABLED
+    page_size = _effective_page_size(None, max_candidates)
+    cache_keys = [
+        _search_page_key(spec.title, spec.skills, page_size, None) if use_cache else None
+        for spec in specs
+    ]
+    first_pages: List[Optional[Dict[str, Any]]] = [_cached_search_page(key) for key in cache_keys]
+    misses = [i for i, page in enumerate(first_pages) if page is None]
+    if misses:
+        calls = [("search_candidates", _search_params(specs[i].title, specs[i].skills, page_size, None)) for i in misses]
+        results = await a2a_batch_call(config.WEBSERVICE_AGENT_URL, calls)
+        for i, result in zip(misses, results):
+            first_pages[i] = _parse_search_page(result, cache_keys[i])
+            if first_pages[i].get("error"):
+                tool_errors.inc(tool="search_candidates")
+
+    async def collect(spec: SearchSpec, page: Dict[str, Any]) -> Tuple[List[CandidateSchema], Optional[str]]:
+        if page.get("error"):
+            return [], page["error"]
+        candidates = [CandidateSchema(**c) for c in page["candidates"]]
+        if page.get("next_cursor") and not (max_candidates and len(candidates) >= max_candidates):
+            remaining = max_candidates - len(candidates) if max_candidates else None
+            try:
+                async for candidate in iter_candidates(
+                    spec.title, spec.skills, page_size=page_size, max_candidates=remaining,
+                    use_cache=use_cache, cursor=page["next_cursor"],
+                ):
+                    candidates.append(candidate)
+            except SearchStreamError as e:
+                return candidates, str(e)
+        return candidates, None
+
+    per_spec = await asyncio.gather(*(collect(spec, page) for spec, page in zip(specs, first_pages)))
+
+    merged: Dict[str, CandidateSchema] = {}
+    errors = []
+    for spec, (candidates, error) in zip(specs, per_spec):
+        if error:
+            errors.append(f"'{spec.title}': {error}")
+        for candidate in candidates:
+            merged.setdefault(candidate.id, candidate)
+    results = list(merged.values())
+    if max_candidates:
+        results = results[:max_candidates]
+    return results, errors
+
+# --- Streaming Search ---
+
+class SearchStreamError(Exception):
+    """Raised by stream_candidates and iter_candidates when the search fails part-way through."""
+
+async def stream_candidates(
+    title: str,
+    skills: str,
+    use_cache: bool = True,
+    max_candidates: Optional[int] = None,
+) -> AsyncIterator[CandidateSchema]:
+    """
+    Yields validated candidates as the webservice_agent produces them, so callers can start
+    saving before the search is complete and never hold the full result set in memory.
+    Uses the agent's NDJSON 'search_candidates_stream' method (one candidate object per line),
+    closing the stream once `max_candidates` have been read.
+    If the agent does not support it, falls back to walking the paged search with
+    iter_candidates, which also serves as a local stand-in when no streaming agent is available.
+    """
+    params = {"title": title, "skills": skills}
+    if max_candidates:
+        params["limit"] = max_candidates
+    guard = downstream_guard(config.WEBSERVICE_AGENT_URL)
+    if not guard.allow_request():
+        raise SearchStreamError(f"Circuit open for {config.WEBSERVICE_AGENT_URL}: downstream agent is failing")
+    payload = _rpc_payload("search_candidates_stream", params)
+    client = client_registry.get(config.WEBSERVICE_AGENT_URL)
+    fallback = False
+    yielded = 0
+    # Per-read timeout; the stream as a whole may legitimately run longer
+    timeout = guard.timeout("search_candidates_stream")
+    started = time.monotonic()
+    try:
+        async with client.stream(
+            "POST", config.WEBSERVICE_AGENT_URL, json=payload,
+            headers={"Accept": NDJSON_CONTENT_TYPE, **traceparent_header()}, timeout=timeout,
+        ) as response:
+            if NDJSON_CONTENT_TYPE not in response.headers.get("content-type", "") and not response.is_server_error:
+                # A plain JSON-RPC reply (typically 'method not found') means no streaming support
+                guard.record_success("search_candidates_stream")
+                fallback = True
+            else:
+                response.raise_for_status()
+                guard.record_success("search_candidates_stream")
+                async for line in response.aiter_lines():
+                    candidate = _parse_candidate_line(line)
+                    if candidate is not None:
+                        yield candidate
+                        yielded += 1
+                        if max_candidates and yielded >= max_candidates:
+                            break
+    except httpx.HTTPError as e:
+        tool_errors.inc(tool="search_candidates_stream")
+        raise SearchStreamError(_record_failure(guard, config.WEBSERVICE_AGENT_URL, "search_candidates_stream", e, timeout))
+    except SearchStreamError:
+        tool_errors.inc(tool="search_candidates_stream")
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        guard.record_cancelled()
+        raise
+    finally:
+        tool_duration.observe(time.monotonic() - started, tool="search_candidates_stream")
+
+    if fallback:
+        logger.info("webservice_agent does not support search_candidates_stream, falling back to paged search_candidates")
+        async for candidate in iter_candidates(title, skills, max_candidates=max_candidates, use_cache=use_cache):
+            yield candidate
+
+def _parse_candidate_line(line: str) -> Optional[CandidateSchema]:
+    """ Parses one NDJSON line into a candidate; an {"error": ...} line aborts the stream. """
+    if not line.strip():
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError:
+        logger.warning(f"Skipping malformed line in candidate stream: {line[:200]}")
+        return None
+    if isinstance(item, dict) and "error" in item:
+        error = item["error"]
+        raise SearchStreamError(error.get("message", "Search stream failed") if isinstance(error, dict) else str(error))
+    return _parse_candidate(item)
+
+def _parse_candidate(item: Any) -> Optional[CandidateSchema]:
+    """ Validates one candidate from a search result; invalid ones are logged, recorded on the run and skipped. """
+    try:
+        if not isinstance(item, dict):
+            raise TypeError(f"expected an object, got {type(item).__name__}")
+        return CandidateSchema(**item)
+    except (TypeError, ValidationError) as e:
+        if isinstance(e, ValidationError):
+            reason = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        else:
+            reason = str(e)
+        candidate_id = item.get("id") if isinstance(item, dict) else None
+        error = f"candidate {candidate_id or '(no id)'}: {reason}"
+        logger.warning(f"Skipping invalid {error}")
+        run = current_run()
+        if run:
+            run.record_invalid_candidate(error)
+        return None
+
+
+@instrument_tool("store_candidate", step="save", timing_detail=lambda r: {"name": r.get("name")})
+async def store_candidate(
+    name: str, title: str, skills: List[str], id: Optional[str] = None, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Tool implementation: Calls the dbservice_agent's create_record method, skipping already-saved candidates.
+    `deadline` (time.monotonic()) bounds the call including retries; see a2a_call.
+    """
+    if id and config.SAVE_DEDUPE_ENABLED and id in saved_candidate_ids:
+        saved_candidate_ids.mark_skipped()
+        output = {"status": "skipped", "name": name}
+        _record_save(id, output)
+        return output
 
-save_candidate_tool = Tool.from_function(
-    name="save_candidate_record",
-    description="Saves the details of a single candidate to the database.",
-    func=lambda input_data: store_candidate(**input_data), # Wrap async call
-    input_model=SaveCandidateInput,
-    output_model=SaveCandidateOutput,
-)
-async def store_candidate(name: str, title: str, skills: List[str]) -> Dict[str, Any]:
-    """ Tool implementation: Calls the dbservice_agent's create_record method. """
     params = {"name": name, "title": title, "skills": skills}
-    result = await a2a_call(config.DBSERVICE_AGENT_URL, "create_record", params)
+    if id:
+        params["idempotency_key"] = id # Lets the db service drop retried or repeated writes
+    result = await a2a_call(config.DBSERVICE_AGENT_URL, "create_record", params, deadline=deadline)
+    output = _save_result(name, result)
+    if id and output["status"] == "saved":
+        await saved_candidate_ids.add_many([id])
+    _record_save(id or name, output)
+    return output
+
+def _record_save(key: str, result: Dict[str, Any]):
+    """ Records a save outcome on the current workflow run, if any. """
+    run = current_run()
+    if run:
+        run.record_save(key, result)
 
+def _save_result(name: str, result: Any) -> Dict[str, Any]:
+    """ Processes a create_record result into SaveCandidateOutput format. """
     if isinstance(result, dict) and "error" not in result:
         if result.get("status") == "saved":
             return {"status": "saved", "name": result.get("name")}
@@ -127,9 +726,173 @@ async def store_candidate(name: str, title: str, skills: List[str]) -> Dict[str,
          # Handle A2A call failure
         return {"status": "error", "error": result.get("error", "Failed to call database service"), "name": name}
 
-# List of all tools for the agent
-hr_tools = [
-    login_tool,
-    search_candidates_tool,
-    save_candidate_tool,
-]
\ No newline at end of file
+
+@instrument_tool("store_candidates", step="save", timing_detail=lambda r: {"candidates": len(r["results"])})
+async def store_candidates(candidates: List[Any]) -> Dict[str, Any]:
+    """ Tool implementation: Saves many candidates with one bulk create_records call to the dbservice_agent. """
+    # Accept CandidateSchema objects (code paths) or plain dicts (LLM tool calls)
+    candidates = [c if isinstance(c, CandidateSchema) else CandidateSchema(**c) for c in candidates]
+    results, pending = split_already_saved(candidates)
+    if pending:
+        to_save = [c for _, c in pending]
+        records = [_candidate_record(c) for c in to_save]
+        bulk_key = (config.DBSERVICE_AGENT_URL, "create_records")
+        if unsupported_methods.get(bulk_key):
+            saved = await _save_records_singly(to_save, records)
+        else:
+            result = await a2a_call(config.DBSERVICE_AGENT_URL, "create_records", {"records": records})
+            if isinstance(result, dict) and result.get("error_details", {}).get("code") == JSONRPC_METHOD_NOT_FOUND:
+                logger.info("dbservice_agent does not support create_records, falling back to batched create_record calls")
+                unsupported_methods.set(bulk_key, True)
+                saved = await _save_records_singly(to_save, records)
+            else:
+                saved = _bulk_save_results(to_save, result)
+
+        for (index, candidate), output in zip(pending, saved):
+            results[index] = output
+            _record_save(candidate.id, output)
+        await saved_candidate_ids.add_many(c.id for c, r in zip(to_save, saved) if r["status"] == "saved")
+
+    return summarize_save_results(results)
+
+async def _save_records_singly(candidates: List[CandidateSchema], records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Older dbservice agents only expose create_record; send one create_record per candidate in a single batch. """
+    calls = [("create_record", record) for record in records]
+    batch_results = await a2a_batch_call(config.DBSERVICE_AGENT_URL, calls)
+    return [_save_result(c.name, r) for c, r in zip(candidates, batch_results)]
+
+def _candidate_record(candidate: CandidateSchema) -> Dict[str, Any]:
+    """ create_record params for a candidate; its id doubles as the idempotency key. """
+    return {
+        "name": candidate.name,
+        "title": candidate.title,
+        "skills": candidate.skills,
+        "idempotency_key": candidate.id,
+    }
+
+def split_already_saved(candidates: List[CandidateSchema]) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[int, CandidateSchema]]]:
+    """
+    Returns (results, pending): results has a 'skipped' entry for every candidate that was
+    already saved (or repeats an earlier id in the list) and None elsewhere; pending holds
+    the (index, candidate) pairs that still need saving.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+    pending = []
+    seen = set()
+    for index, candidate in enumerate(candidates):
+        if config.SAVE_DEDUPE_ENABLED and (candidate.id in saved_candidate_ids or candidate.id in seen):
+            saved_candidate_ids.mark_skipped()
+            results[index] = {"status": "skipped", "name": candidate.name}
+            _record_save(candidate.id, results[index])
+        else:
+            seen.add(candidate.id)
+            pending.append((index, candidate))
+    return results, pending
+
+def summarize_save_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """ Builds the SaveCandidatesOutput shape from per-candidate results. """
+    saved_count = sum(1 for r in results if r.get("status") == "saved")
+    skipped_count = sum(1 for r in results if r.get("status") == "skipped")
+    return {
+        "results": results,
+        "saved_count": saved_count,
+        "failed_count": len(results) - saved_count - skipped_count,
+        "skipped_count": skipped_count,
+    }
+
+def _bulk_save_results(candidates: List[CandidateSchema], result: Any) -> List[Dict[str, Any]]:
+    """ Maps a create_records response onto one SaveCandidateOutput-shaped dict per input candidate. """
+    if isinstance(result, dict) and "error" in result:
+        # The whole bulk call failed, so every candidate in it failed
+        error = result.get("error", "Failed to call database service")
+        return [{"status": "error", "error": error, "name": c.name} for c in candidates]
+
+    items = result.get("results") if isinstance(result, dict) else result
+    if not isinstance(items, list) or len(items) != len(candidates):
+        logger.error(f"create_records returned unexpected result format: {result}")
+        return [{"status": "error", "error": "Invalid response from database service", "name": c.name} for c in candidates]
+
+    results = []
+    for candidate, item in zip(candidates, items):
+        if isinstance(item, dict) and item.get("status") == "saved":
+            results.append({"status": "saved", "name": item.get("name", candidate.name)})
+        else:
+            error = item.get("error", "Save operation failed") if isinstance(item, dict) else "Save operation failed"
+            results.append({"status": "error", "error": error, "name": candidate.name})
+    return results
+
+# --- ADK Tools ---
+# Importing the Vertex AI agents SDK is slow and memory hungry, so the Tool wrappers
+# are only built when the LLM agent is first needed (see agent.get_hr_agent).
+# /health and the deterministic workflow never load the SDK.
+
+# name, full description, compact description (PROMPT_MODE=compact), implementation, input and output schema
+_HR_TOOL_SPECS = [
+    (
+        "login_user",
+        "Authenticates the user with their username and password, returning an access token.",
+        "Log in; returns an access token.",
+        authenticate_user,
+        LoginInput, LoginOutput,
+    ),
+    (
+        "search_for_candidates",
+        "Searches for candidates based on job title and required skills. Requires prior successful login.",
+        "Search candidates by title and skills. Needs login.",
+        find_candidates,
+        SearchInput, SearchOutput,
+    ),
+    (
+        "save_candidate_records",
+        "Saves ALL candidates from a search result to the database in a single call. Preferred over saving candidates one by one.",
+        "Save all found candidates in one call.",
+        store_candidates,
+        SaveCandidatesInput, SaveCandidatesOutput,
+    ),
+    (
+        "save_candidate_record",
+        "Saves the details of a single candidate to the database.",
+        "Save one candidate.",
+        store_candidate,
+        SaveCandidateInput, SaveCandidateOutput,
+    ),
+]
+
+def _tool_specs(prompt_mode: str) -> List[Tuple[str, str, Any, Any, Any]]:
+    """ (name, description, implementation, input schema, output schema) of each tool for `prompt_mode`. """
+    if prompt_mode == "compact":
+        return [(name, compact, fn, compact_schema(inp), compact_schema(out)) for name, _, compact, fn, inp, out in _HR_TOOL_SPECS]
+    return [(name, full, fn, inp, out) for name, full, _, fn, inp, out in _HR_TOOL_SPECS]
+
+def tool_declarations(prompt_mode: str) -> List[Dict[str, Any]]:
+    """ The tool declarations sent to the model in `prompt_mode`, as plain dicts; does not import the ADK. """
+    return [
+        {
+            "name": name,
+            "description": description,
+            "parameters": input_model.model_json_schema(),
+            "response": output_model.model_json_schema(),
+        }
+        for name, description, _, input_model, output_model in _tool_specs(prompt_mode)
+    ]
+
+_hr_tools: Optional[List[Any]] = None
+
+def get_hr_tools() -> List[Any]:
+    """ Returns the list of all tools for the agent, importing the ADK on first use. """
+    global _hr_tools
+    if _hr_tools is None:
+        # Adjust the import based on the actual ADK package structure if it changes
+        from google.cloud.aiplatform.preview.agents import Tool
+
+        _hr_tools = [
+            Tool.from_function(
+                name=name,
+                description=description,
+                func=lambda input_data, fn=fn: fn(**input_data), # Wrap async call
+                input_model=input_model,
+                output_model=output_model,
+            )
+            for name, description, fn, input_model, output_model in _tool_specs(config.PROMPT_MODE)
+        ]
+    return _hr_tools
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from . import config
+from .http_clients import client_registry
+
+logger = logging.getLogger(__name__)
+
+# --- Tracing ---
+# Lightweight, OpenTelemetry-compatible spans: a root span per workflow, child
+# spans for LLM turns, tool invocations and A2A calls. Trace context travels in
+# a ContextVar (so it follows asyncio tasks) and to downstream agents in the W3C
+# 'traceparent' header. Finished traces go to an OTLP/HTTP collector if one is
+# configured, otherwise to a JSON-lines file or the log.
+
+SERVICE_NAME = "hr_recruiting_assistant_adk"
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"  # ok | error
+    status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = "error"
+        self.status_message = message
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "status_message": self.status_message,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def traceparent_header() -> Dict[str, str]:
+    """W3C trace context headers for the current span, or {} outside a trace."""
+    span = current_span()
+    if span is None:
+        return {}
+    return {"traceparent": f"00-{span.trace_id}-{span.span_id}-01"}
+
+
+# --- Exporters ---
+class LogExporter:
+    """Logs each finished trace as one JSON line."""
+
+    def export(self, spans: List[Span]):
+        logger.info(f"trace {json.dumps([s.to_dict() for s in spans], default=str)}")
+
+
+class FileExporter:
+    """Appends finished spans to a JSON-lines file for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans))
+        except OSError as e:
+            logger.warning(f"Could not write spans to {self.path}: {e}")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OTLPHttpExporter:
+    """Posts spans to an OTLP/HTTP collector (JSON encoding) without blocking the caller."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+        self._pending: Set[asyncio.Task] = set()
+
+    def export(self, spans: List[Span]):
+        try:
+            task = asyncio.get_running_loop().create_task(self._post(self._payload(spans)))
+        except RuntimeError:
+            logger.debug("No running event loop; dropping spans for OTLP export")
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _post(self, payload: Dict[str, Any]):
+        try:
+            response = await client_registry.get(self.endpoint).post(self.endpoint, json=payload, timeout=5.0)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"OTLP span export to {self.endpoint} failed: {e}")
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                "status": {"code": 2 if span.status == "error" else 1, "message": span.status_message or ""},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+            }]
+        }
+
+
+def _build_exporter():
+    if config.TRACING_OTLP_ENDPOINT:
+        return OTLPHttpExporter(config.TRACING_OTLP_ENDPOINT)
+    if config.TRACING_FILE_PATH:
+        return FileExporter(config.TRACING_FILE_PATH)
+    return LogExporter()
+
+
+# --- Tracer ---
+class Tracer:
+    """
+    Creates spans and exports them a whole trace at a time: spans are buffered
+    until their local root span ends. Spans ending after their root (e.g. from
+    background tasks) are exported on their own.
+    """
+
+    def __init__(self, exporter, enabled: bool = True):
+        self.exporter = exporter
+        self.enabled = enabled
+        self._buffers: Dict[str, List[Span]] = {}
+
+    @contextmanager
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+        """Runs the block in a new span, a child of the current one if any. Yields None when tracing is off."""
+        if not self.enabled:
+            yield None
+            return
+        parent = current_span()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=attributes,
+        )
+        if parent is None:
+            self._buffers[span.trace_id] = []
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        buffer = self._buffers.get(span.trace_id)
+        if span.parent_id is None:
+            spans = (self._buffers.pop(span.trace_id, None) or []) + [span]
+        elif buffer is not None:
+            buffer.append(span)
+            return
+        else:
+            spans = [span]
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            # Tracing must never break the workflow
+            logger.warning(f"Span export failed: {e}")
+
+
+tracer = Tracer(_build_exporter(), enabled=config.TRACING_ENABLED)
+start_span = tracer.start_span
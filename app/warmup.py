@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import socket
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from . import config
+from .agent import ping_model, preload_agent
+from .http_clients import _origin, client_registry
+
+logger = logging.getLogger(__name__)
+
+# --- Startup Warm-Up ---
+# Runs in the background after startup so the first real request does not pay
+# for DNS lookups, TCP/TLS handshakes or the Vertex AI SDK import and first
+# model call. /health reports "warming" and /ready returns 503 until it is done.
+# Warm-up is best effort: failed steps are logged and reported, but the service
+# still becomes ready once every step has finished or WARMUP_TIMEOUT_SECONDS passed.
+
+class Warmup:
+    def __init__(self):
+        self.status = "pending"  # pending -> warming -> ready
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    async def run(self, urls: Optional[List[str]] = None):
+        self.status = "warming"
+        self.started_at = time.time()
+        steps = []
+        if config.WARMUP_ENABLED:
+            for url in dict.fromkeys(urls or config.DOWNSTREAM_AGENT_URLS):
+                steps.append(self._step(f"downstream:{_origin(url)}", self._warm_downstream(url)))
+        if config.WARMUP_MODEL_PING:
+            steps.append(self._step("model", ping_model()))
+        elif config.AGENT_PRELOAD:
+            steps.append(self._step("agent", preload_agent()))
+        try:
+            await asyncio.wait_for(asyncio.gather(*steps), timeout=config.WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up did not finish within {config.WARMUP_TIMEOUT_SECONDS}s, marking service ready anyway")
+        self.finished_at = time.time()
+        self.status = "ready"
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s")
+
+    async def _step(self, name: str, coro):
+        started = time.monotonic()
+        self.steps[name] = {"status": "running"}
+        try:
+            detail = await coro
+            self.steps[name] = {"status": "ok", **(detail or {})}
+        except asyncio.CancelledError:
+            self.steps[name] = {"status": "timed_out"}
+            raise
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            self.steps[name] = {"status": "failed", "error": str(e)}
+        self.steps[name]["seconds"] = round(time.monotonic() - started, 3)
+
+    async def _warm_downstream(self, url: str) -> Dict[str, Any]:
+        """Resolves the agent's host, then opens pooled keep-alive connections to it."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        loop = asyncio.get_running_loop()
+        addresses = await loop.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+
+        # Any HTTP response leaves its connection in the pool, so a cheap GET to the agent's
+        # health endpoint is enough; concurrent requests open several connections on HTTP/1.1
+        client = client_registry.get(url)
+        health_url = f"{_origin(url)}{config.HEALTH_PROBE_PATH}"
+        responses = await asyncio.gather(
+            *(client.get(health_url, timeout=config.WARMUP_TIMEOUT_SECONDS)
+              for _ in range(max(1, config.WARMUP_CONNECTIONS_PER_DOWNSTREAM))),
+            return_exceptions=True,
+        )
+        errors = [r for r in responses if isinstance(r, Exception)]
+        if len(errors) == len(responses):
+            raise errors[0]
+        statuses = sorted({r.status_code for r in responses if isinstance(r, httpx.Response)})
+        return {"addresses": len(addresses), "connections": len(responses) - len(errors), "http_status": statuses}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+warmup = Warmup()
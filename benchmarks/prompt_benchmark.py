@@ -0,0 +1,93 @@
+"""
+Prompt benchmark for the HR Recruiting Assistant: full vs compact PROMPT_MODE.
+
+Reports, for each prompt mode:
+  * input tokens of the agent instructions and tool declarations sent with every
+    LLM turn (estimated offline, or counted by the model with --exact)
+  * with --llm, latency of LLM-mode workflows run in a fresh interpreter per mode:
+    total wall time and LLM time (agent turn time not spent in tools). Needs the
+    downstream agents and Vertex AI credentials.
+
+Usage:
+    python benchmarks/prompt_benchmark.py [--exact] [--llm] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.prompt_budget import PROMPT_MODES, model_token_counter, prompt_budget  # noqa: E402
+
+WORKFLOW_PROBE = """
+import asyncio, json, os
+from app.agent import run_hr_workflow
+from app.schemas import RecruitingWorkflowInput
+
+async def main():
+    for i in range(int(os.environ["BENCH_RUNS"])):
+        output = await run_hr_workflow(RecruitingWorkflowInput(
+            username=os.getenv("BENCH_USERNAME", "testuser"),
+            password=os.getenv("BENCH_PASSWORD", "password"),
+            title="Software Engineer",
+            skills="python,sql",
+            mode="llm",
+            bypass_cache=True,
+            include_timings=True,
+        ))
+        print(json.dumps({"run": i, "errors": output.errors, **output.timings.dict()}), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def measure_workflows(prompt_mode: str, runs: int) -> list:
+    env = {**os.environ, "PROMPT_MODE": prompt_mode, "BENCH_RUNS": str(runs), "SAVE_DEDUPE_ENABLED": "false"}
+    output = subprocess.run(
+        [sys.executable, "-c", WORKFLOW_PROBE], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    samples = [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+    # The first run also builds the agent and opens connections; keep it out of the comparison
+    return samples[1:] if len(samples) > 1 else samples
+
+
+def _summarize(samples: list, key: str) -> str:
+    values = [s[key] for s in samples if s.get(key) is not None]
+    if not values:
+        return "n/a"
+    return f"median {statistics.median(values) * 1000:.0f} ms (min {min(values) * 1000:.0f}, max {max(values) * 1000:.0f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exact", action="store_true", help="Count tokens with the model's count_tokens API")
+    parser.add_argument("--llm", action="store_true", help="Also time LLM-mode workflows in each prompt mode")
+    parser.add_argument("--runs", type=int, default=5, help="Timed workflows per prompt mode (after one warm-up run)")
+    args = parser.parse_args()
+
+    count = model_token_counter() if args.exact else None
+    budgets = {mode: prompt_budget(mode, count) for mode in PROMPT_MODES}
+    print(f"prompt tokens per turn ({'counted' if args.exact else 'estimated'}):")
+    for mode, budget in budgets.items():
+        print(
+            f"  {mode:<8} total {budget['total_tokens']:>5}"
+            f"  (instructions {budget['instructions_tokens']}, tools {sum(budget['tools_tokens'].values())})"
+        )
+    full, compact = budgets["full"]["total_tokens"], budgets["compact"]["total_tokens"]
+    print(f"  compact saves {full - compact} tokens per turn ({(full - compact) / full:.0%})")
+
+    if args.llm:
+        for mode in PROMPT_MODES:
+            samples = measure_workflows(mode, args.runs + 1)
+            failed = sum(1 for s in samples if s["errors"])
+            print(f"{mode} workflows ({len(samples)} runs, {failed} with errors):")
+            print(f"  total:    {_summarize(samples, 'total_seconds')}")
+            print(f"  LLM time: {_summarize(samples, 'llm_seconds')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup benchmark for the HR Recruiting Assistant.
+
+Measures, each in a fresh interpreter:
+  * import time of app.main (and whether the Vertex AI SDK got imported with it)
+  * time until a uvicorn server answers /health, and the latency of that first request
+  * optionally, latency of the first and second /run_workflow requests (needs the
+    downstream agents, and Vertex AI credentials for --mode llm)
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--workflow] [--mode llm]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "import_seconds": elapsed,
+    "vertex_sdk_loaded": "google.cloud.aiplatform" in sys.modules,
+    "modules_loaded": len(sys.modules),
+}))
+"""
+
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _request(url: str, payload: dict = None, timeout: float = 120.0) -> float:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def measure_server(port: int, workflow_payload: dict = None) -> dict:
+    """Starts uvicorn, polls /health until it answers, then times the first requests."""
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                first_health = _request(f"{base_url}/health", timeout=1.0)
+                break
+            except OSError:
+                time.sleep(0.05)
+        result = {"ready_seconds": time.perf_counter() - started, "first_health_seconds": first_health}
+        if workflow_payload is not None:
+            result["first_workflow_seconds"] = _request(f"{base_url}/run_workflow", workflow_payload)
+            result["second_workflow_seconds"] = _request(f"{base_url}/run_workflow", workflow_payload)
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _summarize(samples: list, key: str) -> str:
+    values = [s[key] for s in samples if key in s]
+    if not values:
+        return "n/a"
+    return f"median {statistics.median(values) * 1000:.1f} ms (min {min(values) * 1000:.1f}, max {max(values) * 1000:.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workflow", action="store_true", help="Also time the first /run_workflow requests")
+    parser.add_argument("--mode", choices=["deterministic", "llm"], default="deterministic")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import app.main:        {_summarize(imports, 'import_seconds')}")
+    print(f"Vertex AI SDK imported: {any(s['vertex_sdk_loaded'] for s in imports)}")
+    print(f"modules loaded:         {imports[-1]['modules_loaded']}")
+
+    payload = None
+    if args.workflow:
+        payload = {
+            "username": os.getenv("BENCH_USERNAME", "testuser"),
+            "password": os.getenv("BENCH_PASSWORD", "password"),
+            "title": "Software Engineer",
+            "skills": "python,sql",
+            "mode": args.mode,
+            "bypass_cache": True,
+        }
+    servers = [measure_server(args.port, payload) for _ in range(args.runs)]
+    print(f"process start -> ready: {_summarize(servers, 'ready_seconds')}")
+    print(f"first /health:          {_summarize(servers, 'first_health_seconds')}")
+    if args.workflow:
+        print(f"first /run_workflow:    {_summarize(servers, 'first_workflow_seconds')}")
+        print(f"second /run_workflow:   {_summarize(servers, 'second_workflow_seconds')}")
+
+
+if __name__ == "__main__":
+    main()
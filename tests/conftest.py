@@ -0,0 +1,83 @@
+import inspect
+import json
+import os
+from typing import Any, Callable, Dict, List
+
+# Fast, deterministic settings; must be in place before the app modules read their config
+os.environ.setdefault("RETRY_BASE_DELAY_SECONDS", "0")
+os.environ.setdefault("RETRY_MAX_DELAY_SECONDS", "0")
+os.environ.setdefault("TRACING_ENABLED", "false")
+os.environ.setdefault("WORKFLOW_MODE", "deterministic")
+os.environ.setdefault("SAVED_CANDIDATE_IDS_PATH", "")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+import httpx
+import pytest
+
+from app import agent, http_clients, resilience, tools
+
+
+class FakeAgents:
+    """
+    Stand-in for the downstream A2A agents behind an httpx.MockTransport.
+    `methods` maps a JSON-RPC method to a handler (plain or async) taking its params and
+    returning either a result, or an httpx.Response to send as is; batches are answered item
+    by item. Every request is recorded in `requests` and its body in `calls`.
+    """
+
+    def __init__(self):
+        self.methods: Dict[str, Callable[[dict], Any]] = {}
+        self.batch_handler: Callable[[httpx.Request, list], Any] = None
+        self.calls: List[Any] = []
+        self.requests: List[httpx.Request] = []
+
+    def methods_called(self) -> List[str]:
+        return ["batch" if isinstance(body, list) else body["method"] for body in self.calls]
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.calls.append(body)
+        self.requests.append(request)
+        if isinstance(body, list):
+            if self.batch_handler:
+                return self.batch_handler(request, body)
+            return httpx.Response(200, json=[await self._answer(item) for item in body])
+        answer = await self._answer(body)
+        return answer if isinstance(answer, httpx.Response) else httpx.Response(200, json=answer)
+
+    async def _answer(self, payload: dict) -> Any:
+        handler = self.methods.get(payload["method"])
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": payload["id"], "error": {"code": -32601, "message": "Method not found"}}
+        result = handler(payload["params"])
+        if inspect.isawaitable(result):
+            result = await result
+        if isinstance(result, httpx.Response):
+            return result
+        return {"jsonrpc": "2.0", "id": payload["id"], "result": result}
+
+
+@pytest.fixture
+def fake_agents(monkeypatch) -> FakeAgents:
+    fake = FakeAgents()
+    monkeypatch.setattr(
+        http_clients.ClientRegistry, "_build_client",
+        lambda self: httpx.AsyncClient(transport=httpx.MockTransport(fake.handle)),
+    )
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Module-level caches, guards and registries are process-wide; every test starts clean."""
+    http_clients.client_registry._clients.clear()
+    resilience._guards.clear()
+    resilience.retry_budget._tokens = resilience.retry_budget.max_tokens
+    tools.auth_token_cache.clear()
+    tools.search_cache.clear()
+    tools.unsupported_methods.clear()
+    tools.saved_candidate_ids._ids.clear()
+    tools.saved_candidate_ids.skipped = 0
+    agent.chat_sessions.clear()
+    agent._inflight_runs.clear()
+    yield
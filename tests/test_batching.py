@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import config
+from app.resilience import CircuitBreaker, downstream_guard
+from app.tools import BATCH_METHOD_KEY, a2a_batch_call, unsupported_methods
+
+URL = config.WEBSERVICE_AGENT_URL
+CALLS = [("search_candidates", {"title": "a"}), ("search_candidates", {"title": "b"})]
+
+
+def batch():
+    return asyncio.run(a2a_batch_call(URL, CALLS))
+
+
+@pytest.fixture
+def echo(fake_agents):
+    fake_agents.methods["search_candidates"] = lambda params: {"title": params["title"]}
+    return fake_agents
+
+
+def test_batch_results_come_back_in_call_order(echo):
+    def reversed_batch(request, body):
+        return httpx.Response(200, json=[
+            {"jsonrpc": "2.0", "id": item["id"], "result": {"title": item["params"]["title"]}} for item in reversed(body)
+        ])
+    echo.batch_handler = reversed_batch
+
+    assert batch() == [{"title": "a"}, {"title": "b"}]
+    assert echo.methods_called() == ["batch"]
+
+
+@pytest.mark.parametrize("rejection", [
+    httpx.Response(400, json={"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}),
+    httpx.Response(200, json={"jsonrpc": "2.0", "id": None, "error": {"code": -32601, "message": "Method not found"}}),
+    httpx.Response(200, json={"unexpected": "object"}),
+])
+def test_rejected_batches_fall_back_to_single_calls_and_are_remembered(echo, rejection):
+    echo.batch_handler = lambda request, body: rejection
+
+    assert batch() == [{"title": "a"}, {"title": "b"}]
+    assert batch() == [{"title": "a"}, {"title": "b"}]
+
+    # The second run goes straight to single calls
+    assert echo.methods_called() == ["batch"] + ["search_candidates"] * 4
+    assert unsupported_methods.get((URL, BATCH_METHOD_KEY))
+
+
+@pytest.mark.parametrize("status", [401, 404, 429])
+def test_other_client_errors_are_plain_failures(echo, status):
+    echo.batch_handler = lambda request, body: httpx.Response(status, json={"detail": "nope"})
+
+    results = batch()
+
+    assert results == [{"error": f"HTTP error {status} from downstream agent"}] * 2
+    assert unsupported_methods.get((URL, BATCH_METHOD_KEY)) is None
+    assert echo.methods_called() == ["batch"]
+
+
+def test_client_error_on_a_trial_batch_does_not_close_the_circuit(echo, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "CIRCUIT_RESET_TIMEOUT_SECONDS", 0.0)
+    breaker = downstream_guard(URL).breaker
+    breaker.record_failure()
+    echo.batch_handler = lambda request, body: httpx.Response(401, json={"detail": "nope"})
+
+    batch()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+
+from app.schemas import CandidateSchema
+from app.tools import store_candidates
+
+
+def candidates(n: int):
+    return [
+        CandidateSchema(id=f"c{i}", name=f"Candidate {i}", title="Engineer", skills=["python"], experience="5y")
+        for i in range(n)
+    ]
+
+
+def test_all_candidates_are_saved_with_one_bulk_call(fake_agents):
+    fake_agents.methods["create_records"] = lambda params: {
+        "results": [{"status": "saved", "name": r["name"]} for r in params["records"]]
+    }
+
+    result = asyncio.run(store_candidates(candidates(3)))
+
+    assert (result["saved_count"], result["failed_count"]) == (3, 0)
+    assert fake_agents.methods_called() == ["create_records"]
+    # Every record carries its candidate id as idempotency key
+    assert [r["idempotency_key"] for r in fake_agents.calls[0]["params"]["records"]] == ["c0", "c1", "c2"]
+
+
+def test_per_record_failures_are_reported_per_candidate(fake_agents):
+    fake_agents.methods["create_records"] = lambda params: {"results": [
+        {"status": "saved", "name": "Candidate 0"}, {"status": "error", "error": "duplicate email"},
+    ]}
+
+    result = asyncio.run(store_candidates(candidates(2)))
+
+    assert (result["saved_count"], result["failed_count"]) == (1, 1)
+    assert result["results"][1] == {"status": "error", "error": "duplicate email", "name": "Candidate 1"}
+
+
+def test_agents_without_create_records_get_batched_create_record_calls(fake_agents):
+    fake_agents.methods["create_record"] = lambda params: {"status": "saved", "name": params["name"]}
+
+    first = asyncio.run(store_candidates(candidates(2)))
+    second = asyncio.run(store_candidates(candidates(4)[2:]))
+
+    assert first["saved_count"] == 2 and second["saved_count"] == 2
+    # create_records is only tried once; afterwards the fallback is used straight away
+    assert fake_agents.methods_called() == ["create_records", "batch", "batch"]
+
+
+def test_failed_bulk_call_fails_every_candidate(fake_agents):
+    fake_agents.methods["create_records"] = lambda params: httpx.Response(400)
+
+    result = asyncio.run(store_candidates(candidates(2)))
+
+    assert result["failed_count"] == 2
+    assert {r["error"] for r in result["results"]} == {"HTTP error 400 from downstream agent"}
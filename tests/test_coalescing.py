@@ -0,0 +1,63 @@
+import asyncio
+
+from app import agent
+from app.agent import coalescing_stats, run_hr_workflow
+from app.schemas import RecruitingWorkflowInput
+
+
+def workflow_input(**overrides) -> RecruitingWorkflowInput:
+    return RecruitingWorkflowInput(**{
+        "username": "u", "password": "p", "title": "Engineer", "skills": "python", "mode": "deterministic", **overrides
+    })
+
+
+def slow_agents(fake_agents):
+    async def login(params):
+        await asyncio.sleep(0.05)  # Keeps the first run in flight while the others arrive
+        return {"success": True, "token": "t"}
+    fake_agents.methods["login"] = login
+    fake_agents.methods["search_candidates"] = lambda params: {"candidates": [], "next_cursor": None}
+    fake_agents.methods["search_candidates_stream"] = lambda params: {"candidates": []}
+
+
+def test_identical_concurrent_workflows_share_one_execution(fake_agents):
+    slow_agents(fake_agents)
+    before = coalescing_stats()
+
+    async def run():
+        return await asyncio.gather(*(run_hr_workflow(workflow_input()) for _ in range(3)))
+    outputs = asyncio.run(run())
+
+    assert outputs[0] is outputs[1] is outputs[2]
+    assert fake_agents.methods_called().count("login") == 1
+    after = coalescing_stats()
+    assert after["workflows_executed"] - before["workflows_executed"] == 1
+    assert after["workflows_coalesced"] - before["workflows_coalesced"] == 2
+    assert agent._inflight_runs == {}
+
+
+def test_different_passwords_are_not_coalesced(fake_agents):
+    slow_agents(fake_agents)
+
+    async def run():
+        return await asyncio.gather(
+            run_hr_workflow(workflow_input(password="p1")), run_hr_workflow(workflow_input(password="p2"))
+        )
+    asyncio.run(run())
+
+    assert fake_agents.methods_called().count("login") == 2
+
+
+def test_coalesced_callers_all_receive_progress_events(fake_agents):
+    slow_agents(fake_agents)
+    first, second = [], []
+
+    async def run():
+        await asyncio.gather(
+            run_hr_workflow(workflow_input(), on_event=first.append),
+            run_hr_workflow(workflow_input(), on_event=second.append),
+        )
+    asyncio.run(run())
+
+    assert [e["event"] for e in first] == [e["event"] for e in second]
+    assert first[-1]["event"] == "completed"
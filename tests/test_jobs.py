@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import jobs, main
+from app.jobs import JobManager
+from app.schemas import RecruitingWorkflowInput
+
+WORKFLOW = {"username": "u", "password": "p", "title": "Engineer", "skills": "python"}
+
+
+@pytest.fixture
+def idle_job_manager(monkeypatch) -> JobManager:
+    """A job manager whose queue holds one job and has no workers, so submitted jobs stay queued."""
+    manager = JobManager(workers=1, max_queue_depth=1, retention_seconds=60)
+    manager._queue = asyncio.Queue(maxsize=1)
+    monkeypatch.setattr(main, "job_manager", manager)
+    return manager
+
+
+def test_full_queue_is_rejected_with_429(idle_job_manager):
+    client = TestClient(main.app)
+
+    accepted = client.post("/jobs", json=WORKFLOW)
+    rejected = client.post("/jobs", json=WORKFLOW)
+
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    assert accepted.json()["status_url"] == f"/jobs/{job_id}"
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "5"
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_non_positive_queue_depth_is_rejected():
+    with pytest.raises(ValueError):
+        JobManager(workers=1, max_queue_depth=0, retention_seconds=60)
+
+
+def test_job_runs_to_completion_and_streams_its_events(fake_agents):
+    fake_agents.methods["login"] = lambda params: {"success": False, "error": "bad password"}
+
+    async def run():
+        manager = JobManager(workers=1, max_queue_depth=5, retention_seconds=60)
+        await manager.start()
+        try:
+            job = manager.submit(RecruitingWorkflowInput(**WORKFLOW, mode="deterministic"))
+            events = [event["event"] async for event in manager.stream(job)]
+        finally:
+            await manager.stop()
+        return job, events
+    job, events = asyncio.run(run())
+
+    assert events[:2] == ["queued", "running"]
+    assert events[-1] == "succeeded"
+    assert job.status == "succeeded" and job.input_data is None
+    assert job.to_dict()["result"]["errors"] == ["Login error: bad password"]
+
+
+def test_stop_cancels_running_and_queued_jobs(monkeypatch):
+    async def never_finishes(input_data, on_event=None):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(jobs, "run_hr_workflow", never_finishes)
+
+    async def run():
+        manager = JobManager(workers=1, max_queue_depth=5, retention_seconds=60)
+        await manager.start()
+        running = manager.submit(RecruitingWorkflowInput(**WORKFLOW))
+        queued = manager.submit(RecruitingWorkflowInput(**WORKFLOW))
+        await asyncio.sleep(0.01)
+        events = []
+
+        async def watch():
+            async for event in manager.stream(running):
+                events.append(event["event"])
+        watcher = asyncio.create_task(watch())
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        await asyncio.wait_for(watcher, 1)
+        return running, queued, events
+    running, queued, events = asyncio.run(run())
+
+    assert events == ["queued", "running", "cancelled"]
+    assert running.status == queued.status == "cancelled"
+    assert queued.input_data is None
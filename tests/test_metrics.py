@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app import config, pipeline
+from app.main import app
+from app.metrics import tool_duration, tool_errors
+from app.schemas import RecruitingWorkflowInput
+
+
+def search_errors() -> float:
+    return tool_errors._values.get(("search_candidates",), 0.0)
+
+
+def test_deterministic_search_failures_are_counted(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "SEARCH_STREAMING_ENABLED", False)
+    fake_agents.methods["login"] = lambda params: {"success": True, "token": "t"}
+    fake_agents.methods["search_candidates"] = lambda params: httpx.Response(500)
+    errors_before = search_errors()
+
+    output = asyncio.run(pipeline.run_deterministic_workflow(
+        RecruitingWorkflowInput(username="u", password="p", title="Engineer", skills="python", bypass_cache=True)
+    ))
+
+    assert output.errors == ["Search error: HTTP error 500 from downstream agent"]
+    assert search_errors() == errors_before + 1
+    assert ("search_candidates",) in tool_duration._counts
+
+
+def test_metrics_endpoint_serves_prometheus_text(fake_agents):
+    tool_errors.inc(tool="search_candidates")
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert "# TYPE hr_tool_errors counter" in lines
+    assert any(line.startswith('hr_tool_errors_total{tool="search_candidates"} ') for line in lines)
+    assert "# TYPE hr_tool_duration_seconds histogram" in lines
+    # Every sample line is "name{labels} value" with a numeric value
+    for line in lines:
+        if line and not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
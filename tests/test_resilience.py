@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+
+from app import config
+from app.resilience import CircuitBreaker, downstream_guard
+from app.tools import a2a_call
+
+URL = config.AUTH_AGENT_URL
+
+
+def call(method="ping"):
+    return asyncio.run(a2a_call(URL, method, {}))
+
+
+def test_breaker_opens_then_half_opens_then_closes(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(config, "CIRCUIT_RESET_TIMEOUT_SECONDS", 0.05)
+    healthy = False
+    fake_agents.methods["ping"] = lambda params: {"pong": True} if healthy else httpx.Response(500)
+    breaker = downstream_guard(URL).breaker
+
+    assert "HTTP error 500" in call()["error"]
+    assert "HTTP error 500" in call()["error"]
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Open: fails fast without reaching the agent
+    sent = len(fake_agents.calls)
+    assert call()["error"].startswith("Circuit open")
+    assert len(fake_agents.calls) == sent
+
+    # After the reset timeout one trial call goes through; its success closes the circuit
+    time.sleep(0.06)
+    healthy = True
+    assert call() == {"pong": True}
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_failed_trial_call_reopens_the_circuit(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "CIRCUIT_RESET_TIMEOUT_SECONDS", 0.05)
+    fake_agents.methods["ping"] = lambda params: httpx.Response(500)
+    breaker = downstream_guard(URL).breaker
+
+    call()
+    time.sleep(0.06)
+    call()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert call()["error"].startswith("Circuit open")
+
+
+def test_client_errors_do_not_count_against_the_agent(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    fake_agents.methods["ping"] = lambda params: httpx.Response(404)
+
+    for _ in range(3):
+        assert call()["error"] == "HTTP error 404 from downstream agent"
+
+    assert downstream_guard(URL).breaker.state == CircuitBreaker.CLOSED
+    assert downstream_guard(URL).breaker.consecutive_failures == 0
+
+
+def test_adaptive_timeout_follows_observed_latency(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_MIN_SAMPLES", 3)
+    monkeypatch.setattr(config, "ADAPTIVE_TIMEOUT_MIN_SECONDS", 0.5)
+    fake_agents.methods["ping"] = lambda params: {"pong": True}
+    guard = downstream_guard(URL)
+
+    assert guard.timeout("ping") == config.A2A_TIMEOUT_SECONDS
+    for _ in range(3):
+        call()
+
+    # Fast answers bring the timeout down to its floor
+    assert guard.timeout("ping") == 0.5
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+
+from app import config
+from app.resilience import downstream_guard, retry_budget
+from app.tools import a2a_call, a2a_batch_call
+
+
+def flaky(failures: int, status: int = 503):
+    """A handler failing `failures` times with `status`, then succeeding."""
+    state = {"left": failures}
+
+    def handler(params):
+        if state["left"] > 0:
+            state["left"] -= 1
+            return httpx.Response(status)
+        return {"ok": True}
+    return handler
+
+
+def test_transient_failures_are_retried(fake_agents):
+    fake_agents.methods["search_candidates"] = flaky(2)
+
+    result = asyncio.run(a2a_call(config.WEBSERVICE_AGENT_URL, "search_candidates", {}))
+
+    assert result == {"ok": True}
+    assert fake_agents.methods_called() == ["search_candidates"] * 3
+    assert downstream_guard(config.WEBSERVICE_AGENT_URL).retries == 2
+
+
+def test_retries_stop_at_max_attempts(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 100)
+    fake_agents.methods["search_candidates"] = flaky(10)
+
+    result = asyncio.run(a2a_call(config.WEBSERVICE_AGENT_URL, "search_candidates", {}))
+
+    assert result["error"] == "HTTP error 503 from downstream agent"
+    assert len(fake_agents.calls) == config.RETRY_MAX_ATTEMPTS_SEARCH_CANDIDATES
+
+
+def test_non_transient_errors_are_not_retried(fake_agents):
+    fake_agents.methods["search_candidates"] = flaky(1, status=400)
+
+    asyncio.run(a2a_call(config.WEBSERVICE_AGENT_URL, "search_candidates", {}))
+
+    assert len(fake_agents.calls) == 1
+
+
+def test_exhausted_retry_budget_denies_retries(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 100)
+    fake_agents.methods["search_candidates"] = flaky(10)
+    retry_budget._tokens = 0
+    monkeypatch.setattr(retry_budget, "ratio", 0.0)
+
+    result = asyncio.run(a2a_call(config.WEBSERVICE_AGENT_URL, "search_candidates", {}))
+
+    assert "error" in result
+    assert len(fake_agents.calls) == 1
+    assert downstream_guard(config.WEBSERVICE_AGENT_URL).retries_denied == 1
+
+
+def test_writes_without_idempotency_key_are_not_resent(fake_agents):
+    fake_agents.methods["create_record"] = flaky(1)
+    keyless = asyncio.run(a2a_call(config.DBSERVICE_AGENT_URL, "create_record", {"name": "a"}))
+    assert "error" in keyless
+    assert len(fake_agents.calls) == 1
+
+    # With a key the db service drops the duplicate, so the write is safe to resend
+    fake_agents.methods["create_record"] = flaky(1)
+    keyed = asyncio.run(a2a_call(config.DBSERVICE_AGENT_URL, "create_record", {"name": "a", "idempotency_key": "c1"}))
+    assert keyed == {"ok": True}
+    assert len(fake_agents.calls) == 3
+
+
+def test_single_method_batches_are_retried_whole(fake_agents):
+    failures = {"left": 1}
+
+    def batch_handler(request, body):
+        if failures["left"]:
+            failures["left"] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"jsonrpc": "2.0", "id": item["id"], "result": {"ok": True}} for item in body])
+    fake_agents.batch_handler = batch_handler
+
+    results = asyncio.run(a2a_batch_call(
+        config.WEBSERVICE_AGENT_URL, [("search_candidates", {"title": "a"}), ("search_candidates", {"title": "b"})]
+    ))
+
+    assert results == [{"ok": True}, {"ok": True}]
+    assert fake_agents.methods_called() == ["batch", "batch"]
@@ -0,0 +1,71 @@
+import asyncio
+
+from app import config, pipeline
+from app.caching import SavedIdRegistry
+from app.schemas import CandidateSchema
+from app.tools import saved_candidate_ids, store_candidate, store_candidates
+
+
+def candidate(i: int) -> CandidateSchema:
+    return CandidateSchema(id=f"c{i}", name=f"Candidate {i}", title="Engineer", skills=["python"], experience="5y")
+
+
+def save_all(fake_agents):
+    fake_agents.methods["create_records"] = lambda params: {
+        "results": [{"status": "saved", "name": r["name"]} for r in params["records"]]
+    }
+    fake_agents.methods["create_record"] = lambda params: {"status": "saved", "name": params["name"]}
+
+
+def test_already_saved_candidates_are_skipped(fake_agents):
+    save_all(fake_agents)
+
+    asyncio.run(store_candidates([candidate(1), candidate(2)]))
+    result = asyncio.run(store_candidates([candidate(2), candidate(3), candidate(3)]))
+
+    assert [r["status"] for r in result["results"]] == ["skipped", "saved", "skipped"]
+    assert [r["name"] for r in fake_agents.calls[1]["params"]["records"]] == ["Candidate 3"]
+    assert saved_candidate_ids.skipped == 2
+
+
+def test_single_saves_are_deduplicated_too(fake_agents):
+    save_all(fake_agents)
+    c = candidate(1)
+
+    first = asyncio.run(store_candidate(c.name, c.title, c.skills, id=c.id))
+    second = asyncio.run(store_candidate(c.name, c.title, c.skills, id=c.id))
+
+    assert (first["status"], second["status"]) == ("saved", "skipped")
+    assert fake_agents.methods_called() == ["create_record"]
+
+
+def test_concurrent_save_stage_skips_known_ids(fake_agents):
+    save_all(fake_agents)
+    asyncio.run(store_candidates([candidate(1)]))
+
+    result = asyncio.run(pipeline.save_candidates_concurrently([candidate(1), candidate(2)]))
+
+    assert (result["saved_count"], result["skipped_count"]) == (1, 1)
+
+
+def test_dedupe_can_be_disabled(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "SAVE_DEDUPE_ENABLED", False)
+    save_all(fake_agents)
+
+    asyncio.run(store_candidates([candidate(1)]))
+    result = asyncio.run(store_candidates([candidate(1)]))
+
+    assert result["saved_count"] == 1
+
+
+def test_registry_persists_and_reloads_ids(tmp_path):
+    path = tmp_path / "saved_ids.txt"
+    registry = SavedIdRegistry(str(path), max_entries=2)
+    asyncio.run(registry.add_many(["a", "b", "c"]))
+
+    reloaded = SavedIdRegistry(str(path), max_entries=2)
+
+    assert "a" not in registry and "c" in registry
+    assert len(reloaded) == 2 and "b" in reloaded and "c" in reloaded
+    # The file is trimmed to the ids kept
+    assert path.read_text().split() == ["b", "c"]
@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas import compact_schema
+
+
+class Inner(BaseModel):
+    name: str = Field(description="The name")
+
+
+class Outer(BaseModel):
+    optional: Optional[Inner] = Field(None, description="typing.Optional")
+    pep604: Inner | None = Field(None, description="PEP 604 union")
+    items: list[Inner] = Field(default_factory=list, description="builtin generic")
+    legacy: List[Inner] = Field(default_factory=list)
+
+
+def test_compact_schema_drops_descriptions_through_every_annotation_form():
+    schema = compact_schema(Outer).model_json_schema()
+
+    assert "description" not in str(schema)
+    assert set(schema["properties"]) == {"optional", "pep604", "items", "legacy"}
+    compact_inner = schema["$defs"]["Inner"]
+    assert compact_inner["properties"]["name"] == {"title": "Name", "type": "string"}
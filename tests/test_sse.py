@@ -0,0 +1,59 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app, format_sse
+
+WORKFLOW = {"username": "u", "password": "p", "title": "Engineer", "skills": "python", "mode": "deterministic"}
+
+
+def candidate(i: int) -> dict:
+    return {"id": f"c{i}", "name": f"Candidate {i}", "title": "Engineer", "skills": ["python"], "experience": "5y"}
+
+
+def parse_sse(text: str):
+    """(event name, data) pairs of a Server-Sent Events body."""
+    events = []
+    for message in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_format_sse():
+    assert format_sse({"event": "login", "success": True}) == 'event: login\ndata: {"event": "login", "success": true}\n\n'
+
+
+def test_workflow_progress_is_streamed_in_order(fake_agents, monkeypatch):
+    monkeypatch.setattr(config, "SEARCH_STREAMING_ENABLED", False)
+    monkeypatch.setattr(config, "SAVE_STRATEGY", "bulk")
+    fake_agents.methods["login"] = lambda params: {"success": True, "token": "t"}
+    fake_agents.methods["search_candidates"] = lambda params: {"candidates": [candidate(1), candidate(2)], "next_cursor": None}
+    fake_agents.methods["create_records"] = lambda params: {"results": [
+        {"status": "saved", "name": "Candidate 1"}, {"status": "error", "error": "duplicate"},
+    ]}
+
+    response = TestClient(app).post("/run_workflow/stream", json=WORKFLOW)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "started"
+    assert names.index("login") < names.index("search") < names.index("save")
+    assert names[-1] == "completed"
+    saves = [data for name, data in events if name == "save"]
+    assert [(s["candidate"], s["status"]) for s in saves] == [("Candidate 1", "saved"), ("Candidate 2", "error")]
+    result = events[-1][1]["result"]
+    assert (result["found_candidates_count"], result["saved_candidates_count"]) == (2, 1)
+
+
+def test_login_failure_still_ends_with_completed(fake_agents):
+    fake_agents.methods["login"] = lambda params: httpx.Response(401)
+
+    events = parse_sse(TestClient(app).post("/run_workflow/stream", json=WORKFLOW).text)
+
+    assert [name for name, _ in events] == ["started", "login", "completed"]
+    assert events[1][1]["success"] is False
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import httpx
+
+from app import config, pipeline
+from app.run_context import WorkflowRun, active_run
+from app.tools import NDJSON_CONTENT_TYPE
+
+
+def candidate(i: int) -> dict:
+    return {"id": f"c{i}", "name": f"Candidate {i}", "title": "Engineer", "skills": ["python"], "experience": "5y"}
+
+
+def ndjson_response(lines, error: Exception = None) -> httpx.Response:
+    """A streamed NDJSON reply that yields `lines`, then raises `error` mid-stream if given."""
+    async def body():
+        for line in lines:
+            yield (line if isinstance(line, str) else json.dumps(line)).encode() + b"\n"
+            await asyncio.sleep(0)
+        if error:
+            raise error
+    return httpx.Response(200, headers={"content-type": NDJSON_CONTENT_TYPE}, content=body())
+
+
+def save_all(params):
+    return {"results": [{"status": "saved", "name": r["name"]} for r in params["records"]]}
+
+
+def run_stream(monkeypatch, batch_size=2):
+    monkeypatch.setattr(config, "STREAM_SAVE_BATCH_SIZE", batch_size)
+    monkeypatch.setattr(config, "SAVE_STRATEGY", "bulk")
+    run = WorkflowRun()
+
+    async def go():
+        with active_run(run):
+            return await pipeline.stream_search_and_save("Engineer", "python")
+    return (*asyncio.run(go()), run)
+
+
+def test_clean_end_of_stream_saves_everything_and_keeps_counts_only(fake_agents, monkeypatch):
+    fake_agents.methods["search_candidates_stream"] = lambda params: ndjson_response([candidate(i) for i in range(5)])
+    fake_agents.methods["create_records"] = save_all
+
+    found, save_result, search_error, run = run_stream(monkeypatch)
+
+    assert (found, search_error) == (5, None)
+    assert save_result["saved_count"] == 5 and save_result["failed_count"] == 0
+    assert save_result["results"] == []
+    assert fake_agents.methods_called().count("create_records") == 3
+    # Nothing per candidate is kept on the run; progress comes as one event per chunk
+    assert run.found_ids == {} and run.save_status == {}
+    assert [e["event"] for e in run.events].count("save_batch") == 3
+    assert not any(e["event"] == "save" for e in run.events)
+
+
+def test_malformed_lines_are_skipped(fake_agents, monkeypatch):
+    invalid = {"id": "bad", "title": "Engineer"}
+    fake_agents.methods["search_candidates_stream"] = lambda params: ndjson_response(
+        [candidate(1), "{not json", invalid, "", candidate(2)]
+    )
+    fake_agents.methods["create_records"] = save_all
+
+    found, save_result, search_error, run = run_stream(monkeypatch)
+
+    assert (found, search_error) == (2, None)
+    assert save_result["saved_count"] == 2
+    assert len(run.invalid_candidates) == 1
+
+
+def test_mid_stream_timeout_keeps_what_was_saved(fake_agents, monkeypatch):
+    fake_agents.methods["search_candidates_stream"] = lambda params: ndjson_response(
+        [candidate(1), candidate(2), candidate(3)], error=httpx.ReadTimeout("read timed out")
+    )
+    fake_agents.methods["create_records"] = save_all
+
+    found, save_result, search_error, run = run_stream(monkeypatch)
+
+    assert found == 3
+    assert search_error == "Request timed out"
+    assert save_result["saved_count"] == 3
+    assert run.search_errors == ["Request timed out"]
+
+
+def test_failed_chunk_is_recorded_without_stopping_the_stream(fake_agents, monkeypatch):
+    fake_agents.methods["search_candidates_stream"] = lambda params: ndjson_response([candidate(i) for i in range(6)])
+    save_batch = pipeline._save_batch
+
+    async def flaky_save_batch(chunk):
+        if chunk[0].id == "c2":
+            raise RuntimeError("db exploded")
+        return await save_batch(chunk)
+    monkeypatch.setattr(pipeline, "_save_batch", flaky_save_batch)
+    fake_agents.methods["create_records"] = save_all
+
+    found, save_result, search_error, run = run_stream(monkeypatch)
+
+    assert (found, search_error) == (6, None)
+    assert save_result["saved_count"] == 4
+    assert save_result["failed_count"] == 2
+    assert [r["name"] for r in save_result["results"]] == ["Candidate 2", "Candidate 3"]
+    assert all("db exploded" in r["error"] for r in save_result["results"])
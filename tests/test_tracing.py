@@ -0,0 +1,37 @@
+import asyncio
+
+from app import config, pipeline
+from app.schemas import RecruitingWorkflowInput
+from app.tracing import tracer
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def test_deterministic_search_is_traced(fake_agents, monkeypatch):
+    exporter = CollectingExporter()
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(config, "SEARCH_STREAMING_ENABLED", False)
+    fake_agents.methods["login"] = lambda params: {"success": True, "token": "t"}
+    fake_agents.methods["search_candidates"] = lambda params: {"candidates": [], "next_cursor": None}
+
+    async def run():
+        with tracer.start_span("workflow"):
+            await pipeline.run_deterministic_workflow(
+                RecruitingWorkflowInput(username="u", password="p", title="Engineer", skills="python")
+            )
+    asyncio.run(run())
+
+    by_name = {span.name: span for span in exporter.spans}
+    search, a2a = by_name["tool.search_candidates"], by_name["a2a search_candidates"]
+    assert search.parent_id == by_name["pipeline.search"].span_id
+    assert a2a.parent_id == search.span_id
+    # The downstream call carried the trace context of its A2A span
+    search_request = fake_agents.requests[fake_agents.methods_called().index("search_candidates")]
+    assert search_request.headers["traceparent"] == f"00-{a2a.trace_id}-{a2a.span_id}-01"